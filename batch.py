@@ -0,0 +1,141 @@
+"""Render every month-end report into one ZIP.
+
+For each substation and NOCS this produces the same table report the
+dashboard offers, plus one summary per Circle and Zone and the two overall
+summaries. The reports are rendered across a process pool.
+
+The feeder table is never pickled to the workers. The parent resolves the
+columnar snapshot (the published one in shared mode) and passes only its
+directory. Each worker memory-maps the snapshot once in its initializer,
+so the numeric column files are shared read-only through the page cache,
+and loads the same "SS List" and loss sheets as the dashboard, so report
+names match it. A task is just ``(kind, name)``, and a worker sends back
+the file name and the PDF bytes.
+
+The pool is capped at ``MAX_JOBS`` workers, which start from a fresh
+interpreter (forkserver, or spawn where there is none): the caller may be
+a threaded server such as the dashboard, which must not be forked. A
+process runs one pool at a time.
+
+Usage: ``python batch.py EB.xlsx [-o reports.zip] [--month "June-2024"] [--jobs 4]``
+"""
+import io
+import multiprocessing
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import FeederData, listing, loss_history, month_history, snapshot_dir
+from reports import build_pdf
+
+MAX_JOBS = 4
+# One pool at a time per process: concurrent callers (dashboard sessions) queue instead of adding workers
+_pool_lock = threading.Lock()
+
+SUBSTATION_COLUMNS = ["Feeder_Name", "CF", "Opening_Reading", "Closing_Reading", "OMF",
+                      "Consumption", "Corrected_Consumption", "NOCS"]
+NOCS_COLUMNS = ["Substation_Name", "Feeder_Name", "CF", "Opening_Reading", "Closing_Reading", "OMF",
+                "Consumption", "Corrected_Consumption"]
+
+
+def tasks(balance):
+    """Every ``(kind, name)`` report of a month."""
+    yield "summary", "nocs"
+    yield "summary", "zone-circle-nocs"
+    for kind in ("substation", "nocs"):
+        for name in balance.data.index[kind].keys():
+            yield kind, name
+    for name in balance.nocs["Circle"].unique():
+        yield "circle", name
+    for name in balance.nocs["Zone"].unique():
+        yield "zone", name
+
+
+def render(balance, kind, name):
+    """``(path in the ZIP, PDF bytes)`` for one report."""
+    by_zone = balance.by_zone
+    if kind == "substation":
+        title, data, report_type = "Substation Name: " + name, balance.table(kind, name)[SUBSTATION_COLUMNS], "table"
+    elif kind == "nocs":
+        title, data, report_type = "NOCS Name: " + name, balance.table(kind, name)[NOCS_COLUMNS], "table"
+    elif kind == "circle":
+        data = by_zone[by_zone["Circle"] == name][["NOCS", "Corrected_Consumption"]]
+        title, report_type = "Summary of Circle " + name, "summary"
+    elif kind == "zone":
+        data = by_zone[by_zone["Zone"] == name][["Circle", "NOCS", "Corrected_Consumption"]]
+        title, report_type = "Summary of Zone " + name, "summary"
+    elif name == "nocs":
+        data = balance.nocs[["NOCS", "Corrected_Consumption"]]
+        title, report_type = "Summary of NOCS-Wise Import", "summary"
+    else:
+        data = by_zone[["Zone", "Circle", "NOCS", "Corrected_Consumption"]]
+        title, report_type = "Summary of Zone, Circle and NOCS-Wise Import", "summary"
+    return f"{kind}/{_file_name(name)}.pdf", build_pdf(title, data, report_type)
+
+
+def _file_name(name):
+    return re.sub(r"[^\w.-]+", "_", str(name)).strip("_") or "unnamed"
+
+
+def _load(path, workbook):
+    # As the dashboard loads it (app.load_feeders), so the registry's names and order are the same
+    return FeederData.from_snapshot(path, loss_history=loss_history(workbook), listing=listing(workbook),
+                                    history=month_history())
+
+
+_worker = None
+
+
+def _init_worker(path, workbook, month):
+    global _worker
+    _worker = _load(path, workbook).balance(month)
+
+
+def _render(task):
+    return render(_worker, *task)
+
+
+def _pool(jobs, initargs):
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context(method),
+                               initializer=_init_worker, initargs=initargs)
+
+
+def export_zip(workbook="EB.xlsx", month=None, jobs=None, out=None):
+    """Render all reports for ``month`` (default: latest) into a ZIP.
+
+    ``out`` is a path or binary file object; without it the ZIP is returned
+    as bytes. ``jobs`` defaults to the CPU count, at most ``MAX_JOBS``;
+    ``jobs=1`` renders in-process.
+    """
+    jobs = jobs or min(os.cpu_count() or 1, MAX_JOBS)
+    source = snapshot_dir(workbook)
+    balance = _load(source, workbook).balance(month)
+    todo = list(tasks(balance))
+    target = io.BytesIO() if out is None else out
+    with zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED) as zf:
+        if jobs == 1:
+            for path, pdf in (render(balance, *task) for task in todo):
+                zf.writestr(path, pdf)
+        else:
+            with _pool_lock, _pool(jobs, (source, workbook, balance.month)) as pool:
+                for path, pdf in pool.map(_render, todo, chunksize=8):
+                    zf.writestr(path, pdf)
+    return target.getvalue() if out is None else len(todo)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Render every substation/NOCS/circle/zone report into a ZIP.")
+    parser.add_argument("workbook", nargs="?", default="EB.xlsx")
+    parser.add_argument("-o", "--output", default="reports.zip")
+    parser.add_argument("--month", help='month label as in the dashboard, e.g. "June-2024" (default: latest)')
+    parser.add_argument("--jobs", type=int, help=f"worker processes (default: CPU count, at most {MAX_JOBS})")
+    args = parser.parse_args()
+    t0 = time.perf_counter()
+    count = export_zip(args.workbook, args.month, args.jobs, out=args.output)
+    print(f"{count} reports -> {args.output} in {time.perf_counter() - t0:.1f}s")
@@ -0,0 +1,79 @@
+"""Compare the per-cell FPDF table loop against ``pdf_table.write_table``.
+
+Tables are synthetic feeder rows (the six columns of the substation report)
+at several sizes. Usage::
+
+    python benchmarks/bench_pdf.py [--rows 1000 5000 20000] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from fpdf import FPDF
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pdf_table import write_table  # noqa: E402
+
+
+def legacy_table(pdf, df):
+    # The loop app.output_df_to_pdf used before write_table.
+    pdf.set_font("Arial", "B", 8)
+    cols = df.columns
+    for col in cols:
+        pdf.cell(35, 6, col, align="C", border=1)
+    pdf.ln(6)
+    pdf.set_font("Arial", "", 7)
+    for row in df.itertuples():
+        for col in cols:
+            pdf.cell(35, 6, str(getattr(row, col)), align="C", border=1)
+        pdf.ln(6)
+
+
+def synthetic(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Feeder_Name": [f"Feeder {i % 97} ({i})" for i in range(rows)],
+        "Opening_Reading": rng.integers(0, 10**6, rows),
+        "Closing_Reading": rng.integers(0, 10**6, rows),
+        "OMF": rng.choice([1000, 2000, 4000], rows),
+        "Consumption": rng.integers(0, 10**6, rows),
+        "Corrected_Consumption": rng.random(rows) * 10**6,
+    })
+
+
+def render(writer, df):
+    pdf = FPDF("landscape", "mm", "A4")
+    pdf.add_page()
+    writer(pdf, df)
+    return pdf.output(dest="S").encode("latin-1")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>7} {'per-cell s':>11} {'write_table s':>14} {'speed-up':>9} {'pages':>6}")
+    for rows in args.rows:
+        df = synthetic(rows)
+        best = {}
+        for name, writer in (("legacy", legacy_table), ("fast", write_table)):
+            times = []
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                out = render(writer, df)
+                times.append(time.perf_counter() - t0)
+            best[name] = min(times)
+        pages = out.count(b"/Type /Page\n")
+        print(f"{rows:>7} {best['legacy']:>11.3f} {best['fast']:>14.3f} "
+              f"{best['legacy'] / best['fast']:>8.1f}x {pages:>6}")
+
+
+if __name__ == "__main__":
+    main()
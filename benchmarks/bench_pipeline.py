@@ -0,0 +1,254 @@
+"""Time and memory-profile every stage of the energy-balance pipeline.
+
+Runs on synthetic workbooks (``synthetic_workbook.py``) at multiples of
+today's 1226 feeder rows, 1x, 10x and 100x by default, with substations
+scaled alongside. Stages, in pipeline order:
+
+    read_sheet      Linked_11KV parsed by xlsx_reader (the old get_data_from_excel)
+    listing         "SS List" and "%Loss " sheets parsed
+    snapshot_write  feeder table written as a columnar snapshot
+    snapshot_read   snapshot memory-mapped back into a frame
+    feeder_data     FeederData: registry, partition indexes, feeder x month store
+    nocs            consumption_by_nocs of the latest month
+    totals          NOCS -> Circle -> Zone rollup
+    html_table      the Zone/Circle/NOCS HTML table
+    treemap_nocs    NOCS treemap, built and serialised to JSON as st.plotly_chart does
+    treemap_zcn     Zone/Circle/NOCS treemap, same
+    bar_nocs        consumption-by-NOCS bar chart, same
+    sunburst_nocs   substation/feeder sunburst of the largest NOCS through chart_data, same
+    substations     per-substation consumption and loss
+    drill_downs     the tables of 50 substations spread over the list
+    losses          LossModel joined and one month's losses at every level
+    flags           outlier matrix and the meter-reading flag table
+    search          SearchIndex over every name
+    pdf_summary     NOCS summary report (output_df_to_pdf)
+    pdf_nocs        table report of the largest NOCS
+
+Each stage runs ``--repeat`` times on fresh objects and reports the best
+wall time, then once more under ``tracemalloc`` for its peak allocation
+(numpy buffers included). Results are written to ``benchmarks/results/``
+as JSON, and every stage is compared with the newest earlier result file
+(or ``--compare``); stages slower than ``--threshold`` times the baseline
+are marked. Usage::
+
+    python benchmarks/bench_pipeline.py [--scales 1 10 100] [--months 17] [--repeat 3]
+"""
+import argparse
+import datetime
+import glob
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import plotly  # noqa: E402
+
+import figures  # noqa: E402
+from batch import render  # noqa: E402
+from engine import EnergyBalance, FeederData  # noqa: E402
+from hierarchy import read_listing  # noqa: E402
+from losses import LOSS_SHEET, LossModel, parse_loss_sheet  # noqa: E402
+from search import SearchIndex  # noqa: E402
+from snapshot import read_snapshot, write_snapshot  # noqa: E402
+from synthetic_workbook import FEEDERS, LINKED_COLUMNS, MONTHS, SUBSTATIONS, column_letters, generate  # noqa: E402
+from validation import flag_table, outliers  # noqa: E402
+from xlsx_reader import read_sheet  # noqa: E402
+
+RESULTS = os.path.join(ROOT, "benchmarks", "results")
+# Substation tables built by the drill_downs stage, spread over the list
+DRILL_DOWNS = 50
+
+
+# ---- stages ----
+def stages(path, feeders, substations, months, scratch):
+    """``[(name, run)]`` in pipeline order; ``ctx`` carries each stage's output to the next."""
+    ctx = {}
+    usecols = f"B:{column_letters(len(LINKED_COLUMNS) + months - 1)}"
+
+    def read():
+        ctx["df"] = read_sheet(path, "Linked_11KV", usecols=usecols, nrows=feeders)
+
+    def listing():
+        ctx["listing"] = read_listing(read_sheet(path, "SS List", usecols="A:D", nrows=substations + 2))
+        ctx["history"] = parse_loss_sheet(read_sheet(path, **LOSS_SHEET))
+
+    def snapshot_write():
+        target = tempfile.mkdtemp(dir=scratch)
+        shutil.rmtree(target)
+        write_snapshot(ctx["df"], target)
+        ctx["snapshot"] = target
+
+    def snapshot_read():
+        ctx["frame"] = read_snapshot(ctx["snapshot"])
+
+    def feeder_data():
+        data = ctx["data"] = FeederData(ctx["frame"], loss_history=ctx["history"], listing=ctx["listing"])
+        ctx["balance"] = data.balance()
+
+    def nocs():
+        return EnergyBalance(ctx["data"], ctx["balance"].month).nocs
+
+    def totals():
+        nocs = ctx["balance"].nocs
+        return ctx["data"].registry.rollup(nocs["NOCS"], nocs["Corrected_Consumption"])
+
+    def drill_downs():
+        balance = EnergyBalance(ctx["data"], ctx["balance"].month)
+        names = list(ctx["data"].index["substation"].keys())
+        for name in names[::max(1, len(names) // DRILL_DOWNS)][:DRILL_DOWNS]:
+            balance.table("substation", name)
+
+    def flags():
+        data, balance = ctx["data"], ctx["balance"]
+        column = outliers(data.monthly.values)[:, data.monthly.position(balance.month)]
+        return flag_table(data.df, balance.month_values, column)
+
+    def largest_nocs():
+        return ctx["balance"].nocs.sort_values("Corrected_Consumption").iloc[-1]["NOCS"]
+
+    def sunburst_nocs():
+        rows = ctx["balance"].drill_down("nocs", largest_nocs())[0]
+        rows = rows[["Substation_Name", "Feeder_Name", "Corrected_Consumption"]]
+        return figures.feeder_sunburst(rows, ["Substation_Name", "Feeder_Name"]).to_json()
+
+    def pdf_nocs():
+        return render(ctx["balance"], "nocs", largest_nocs())
+
+    return [
+        ("read_sheet", read),
+        ("listing", listing),
+        ("snapshot_write", snapshot_write),
+        ("snapshot_read", snapshot_read),
+        ("feeder_data", feeder_data),
+        ("nocs", nocs),
+        ("totals", totals),
+        ("html_table", lambda: figures.html_table(ctx["data"].registry, ctx["balance"].totals)),
+        ("treemap_nocs", lambda: figures.nocs_treemap(ctx["balance"].nocs).to_json()),
+        ("treemap_zcn", lambda: figures.zone_treemap(ctx["balance"].nocs).to_json()),
+        ("bar_nocs", lambda: figures.nocs_bar(ctx["balance"].nocs).to_json()),
+        ("sunburst_nocs", sunburst_nocs),
+        ("substations", lambda: EnergyBalance(ctx["data"], ctx["balance"].month).substations),
+        ("drill_downs", drill_downs),
+        ("losses", lambda: LossModel(ctx["data"], ctx["history"]).month(ctx["balance"].month)),
+        ("flags", flags),
+        ("search", lambda: SearchIndex.from_data(ctx["data"])),
+        ("pdf_summary", lambda: render(ctx["balance"], "summary", "nocs")),
+        ("pdf_nocs", pdf_nocs),
+    ]
+
+
+def measure(run, repeat):
+    """``(best seconds, peak MB)`` of ``run``."""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    run()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return min(times), peak / 2**20
+
+
+def workbook(workdir, feeders, substations, months):
+    """Path of the synthetic workbook of this size, generated on first use."""
+    path = os.path.join(workdir, f"synthetic-{feeders}-{substations}-{months}.xlsx")
+    if not os.path.exists(path):
+        t0 = time.perf_counter()
+        generate(path, feeders, substations, months)
+        print(f"generated {os.path.basename(path)} in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+    return path
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _baseline(path):
+    if path is None:
+        earlier = sorted(glob.glob(os.path.join(RESULTS, "pipeline-*.json")))
+        path = earlier[-1] if earlier else None
+    if path is None:
+        return None, {}
+    with open(path, encoding="utf-8") as fh:
+        runs = json.load(fh)["runs"]
+    return path, {(run["feeders"], run["months"]): run["stages"] for run in runs}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--months", type=int, default=MONTHS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "eb-bench"),
+                        help="where the synthetic workbooks are kept between runs")
+    parser.add_argument("--compare", help="result file to compare with (default: the newest in benchmarks/results)")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+    os.makedirs(args.workdir, exist_ok=True)
+    # load_sheet keeps its snapshots under the working directory; keep them with the workbooks
+    os.chdir(args.workdir)
+    baseline_path, baseline = _baseline(args.compare)
+    if baseline_path:
+        print(f"baseline: {os.path.relpath(baseline_path, ROOT)}")
+
+    runs = []
+    for scale in args.scales:
+        feeders, substations = FEEDERS * scale, SUBSTATIONS * scale
+        path = workbook(args.workdir, feeders, substations, args.months)
+        before = baseline.get((feeders, args.months), {})
+        print(f"\n{scale}x: {feeders} feeders, {substations} substations, {args.months} past months")
+        print(f"{'stage':<15} {'best s':>9} {'peak MB':>9} {'vs base':>8}")
+        results = {}
+        scratch = tempfile.mkdtemp(dir=args.workdir)
+        try:
+            for name, run in stages(path, feeders, substations, args.months, scratch):
+                seconds, peak = measure(run, args.repeat)
+                results[name] = {"seconds": round(seconds, 6), "peak_mb": round(peak, 3)}
+                ratio = seconds / before[name]["seconds"] if name in before and before[name]["seconds"] else None
+                mark = "" if ratio is None else f"{ratio:>7.2f}x" + (" SLOWER" if ratio > args.threshold else "")
+                print(f"{name:<15} {seconds:>9.4f} {peak:>9.1f} {mark}")
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+        runs.append({"scale": scale, "feeders": feeders, "substations": substations, "months": args.months,
+                     "stages": results})
+
+    if not args.no_save:
+        os.makedirs(RESULTS, exist_ok=True)
+        now = datetime.datetime.now()
+        out = os.path.join(RESULTS, f"pipeline-{now:%Y%m%d-%H%M%S}.json")
+        with open(out, "w", encoding="utf-8") as fh:
+            json.dump({
+                "when": now.isoformat(timespec="seconds"),
+                "commit": _commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "versions": {"numpy": np.__version__, "pandas": pd.__version__, "plotly": plotly.__version__},
+                "repeat": args.repeat,
+                "runs": runs,
+            }, fh, indent=1)
+        print(f"\nsaved {os.path.relpath(out, ROOT)}")
+
+
+if __name__ == "__main__":
+    main()
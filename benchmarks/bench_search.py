@@ -0,0 +1,73 @@
+"""Compare ``search.SearchIndex`` queries against a linear scan of the names.
+
+Names are synthetic feeders (``"11 kV <word> Feeder (F-n)"`` under a few
+hundred substations). The scan is what a select box filter does: normalise
+every name and keep those containing the query. Usage::
+
+    python benchmarks/bench_search.py [--feeders 1000 10000 100000] [--queries 200]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from hierarchy import canonical  # noqa: E402
+from search import SearchIndex  # noqa: E402
+
+SYLLABLES = ["ba", "la", "ka", "dha", "mon", "di", "ra", "sha", "pur", "go", "ni", "tej", "gaon", "azi", "mo", "ti"]
+
+
+def synthetic(feeders, seed=0):
+    rng = np.random.default_rng(seed)
+    words = ["".join(rng.choice(SYLLABLES, size=rng.integers(2, 4))).title() for _ in range(feeders)]
+    substations = [f"{w} 33/11KV S/S" for w in words[: max(1, feeders // 12)]]
+    entries = []
+    for i, word in enumerate(words):
+        substation = substations[i % len(substations)]
+        name = f"11 kV {word} Feeder (F-{i % 9 + 1})"
+        entries.append(("feeder", name, substation, None, ("substation", substation), name + " " + substation))
+    return entries
+
+
+def scan(entries, text):
+    key = canonical(text)
+    return [e for e in entries if key in canonical(e[-1])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--feeders", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'feeders':>8} {'build s':>8} {'query ms':>9} {'scan ms':>8} {'speed-up':>9}")
+    for feeders in args.feeders:
+        entries = synthetic(feeders)
+        t0 = time.perf_counter()
+        index = SearchIndex(entries)
+        build = time.perf_counter() - t0
+        rng = np.random.default_rng(1)
+        # Partial names and one-letter typos of real entries
+        queries = []
+        for e in rng.choice(len(entries), size=args.queries):
+            word = entries[e][1].split()[2].lower()
+            queries.append(word[:4] if e % 2 else word[:2] + word[3:])
+        t0 = time.perf_counter()
+        for q in queries:
+            index.query(q)
+        query = (time.perf_counter() - t0) / len(queries)
+        sample = queries[: max(1, min(len(queries), 2000000 // feeders))]
+        t0 = time.perf_counter()
+        for q in sample:
+            scan(entries, q)
+        linear = (time.perf_counter() - t0) / len(sample)
+        print(f"{feeders:>8} {build:>8.2f} {query * 1e3:>9.3f} {linear * 1e3:>8.1f} {linear / query:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
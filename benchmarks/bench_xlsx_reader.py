@@ -0,0 +1,62 @@
+"""Compare the streaming sheet reader against ``pd.read_excel(engine="openpyxl")``.
+
+Each reader runs in a fresh interpreter so peak RSS is not polluted by the
+other one. Usage::
+
+    python benchmarks/bench_xlsx_reader.py [EB.xlsx] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CHILD = r"""
+import json, resource, sys, time, warnings
+warnings.simplefilter("ignore")
+sys.path.insert(0, {root!r})
+import pandas as pd
+from xlsx_reader import read_sheet
+base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+t0 = time.perf_counter()
+if {reader!r} == "openpyxl":
+    df = pd.read_excel({path!r}, engine="openpyxl", sheet_name={sheet!r},
+                       usecols={usecols!r}, nrows={nrows!r})
+else:
+    df = read_sheet({path!r}, {sheet!r}, {usecols!r}, {nrows!r})
+elapsed = time.perf_counter() - t0
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"seconds": elapsed, "rss_kb": peak - base, "shape": list(df.shape)}}))
+"""
+
+
+def run_once(reader, path, sheet, usecols, nrows):
+    code = _CHILD.format(root=ROOT, reader=reader, path=path, sheet=sheet,
+                         usecols=usecols, nrows=nrows)
+    out = subprocess.run([sys.executable, "-c", code], check=True,
+                         capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("workbook", nargs="?", default=os.path.join(ROOT, "EB.xlsx"))
+    parser.add_argument("--sheet", default="Linked_11KV")
+    parser.add_argument("--usecols", default="B:Z")
+    parser.add_argument("--nrows", type=int, default=1226)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'reader':<10} {'best s':>8} {'peak RSS MB':>12}  shape")
+    for reader in ("openpyxl", "stream"):
+        runs = [run_once(reader, args.workbook, args.sheet, args.usecols, args.nrows)
+                for _ in range(args.repeat)]
+        best = min(r["seconds"] for r in runs)
+        rss = max(r["rss_kb"] for r in runs) / 1024
+        print(f"{reader:<10} {best:>8.3f} {rss:>12.1f}  {tuple(runs[0]['shape'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Write synthetic EB.xlsx-shaped workbooks for the benchmarks.
+
+The workbook has the three sheets the pipeline reads, laid out like the
+real one:
+
+* ``Linked_11KV``: the feeder table, columns A onwards as in EB.xlsx (SL,
+  Feeder_Name, ..., NOCS, Substation_Name, SUBSTN_CODE, then one
+  ``<Month><YY>_Consumption`` column per past month, newest first). About
+  one row in nine is an NOCS == 0 row, as in the real sheet.
+* ``SS List``: the NOCS codes and names in A:B, substations and their
+  numbers in C:D.
+* ``%Loss ``: the monthly loss % per substation, names in C, one
+  ``<Month>-<YYYY>`` column per month from E.
+
+NOCS are those of ``hierarchy.nocs_mapping``; substations are spread over
+them round-robin and feeders over the substations. Cells are written
+straight as sheet XML with a shared-strings table (openpyxl's write-only
+mode takes about a minute for the 100x sheet). Usage::
+
+    python benchmarks/synthetic_workbook.py out.xlsx [--feeders 1226] [--substations 88] [--months 17]
+"""
+import argparse
+import os
+import sys
+import zipfile
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from hierarchy import nocs_mapping  # noqa: E402
+
+# Today's EB.xlsx: Linked_11KV rows, substations, past-month columns
+FEEDERS = 1226
+SUBSTATIONS = 88
+MONTHS = 17
+CURRENT = pd.Period("2024-09", freq="M")
+
+LINKED_COLUMNS = ["SL", "Feeder_Name", "FEEDER_NO", "FEEDER_NO", "Voltage", "Type", "Meter_No", "CF",
+                  "Opening_Reading", "Closing_Reading", "Difference", "OMF", "Blank", "Consumption",
+                  "Corrected_Consumption", "NOCS", "Substation_Name", "SUBSTN_CODE"]
+
+SYLLABLES = ["ba", "la", "ka", "dha", "mon", "di", "ra", "sha", "pur", "go", "ni", "tej", "gaon", "azi", "mo", "ti"]
+OMF = [1, 60, 100, 1000, 2000, 40000, 60000]
+
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>
+{sheets}
+</Types>"""
+_SHEET_TYPE = ('<Override PartName="/xl/worksheets/sheet{n}.xml" '
+               'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>')
+_ROOT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+_WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets>{sheets}</sheets>
+</workbook>"""
+_WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+{rels}
+<Relationship Id="rId{strings}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" Target="sharedStrings.xml"/>
+</Relationships>"""
+_SHEET_REL = ('<Relationship Id="rId{n}" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+              'relationships/worksheet" Target="worksheets/sheet{n}.xml"/>')
+_WORKSHEET = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+              '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+
+
+def column_letters(i):
+    """Spreadsheet letters of the 0-based column ``i`` (0 -> A, 26 -> AA)."""
+    s = ""
+    i += 1
+    while i:
+        i, r = divmod(i - 1, 26)
+        s = chr(65 + r) + s
+    return s
+
+
+class _Strings:
+    """The shared-strings table; a string cell refers to its position here."""
+
+    def __init__(self):
+        self.index = {}
+
+    def __call__(self, text):
+        return self.index.setdefault(text, len(self.index))
+
+    def xml(self):
+        items = "".join(f'<si><t xml:space="preserve">{escape(s)}</t></si>' for s in self.index)
+        return ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                f'count="{len(self.index)}" uniqueCount="{len(self.index)}">{items}</sst>')
+
+
+def _sheet_xml(rows, strings):
+    """Sheet XML of ``rows`` (lists of cells; None/NaN cells are left out)."""
+    letters = [column_letters(i) for i in range(max((len(r) for r in rows), default=0))]
+    parts = [_WORKSHEET]
+    for r, row in enumerate(rows, start=1):
+        cells = []
+        for c, value in enumerate(row):
+            if value is None or (isinstance(value, float) and np.isnan(value)):
+                continue
+            if isinstance(value, str):
+                cells.append(f'<c r="{letters[c]}{r}" t="s"><v>{strings(value)}</v></c>')
+            else:
+                cells.append(f'<c r="{letters[c]}{r}"><v>{value!r}</v></c>')
+        parts.append(f'<row r="{r}">{"".join(cells)}</row>')
+    parts.append("</sheetData></worksheet>")
+    return "".join(parts)
+
+
+def write_xlsx(path, sheets):
+    """Write ``{sheet name: rows}`` as an .xlsx workbook."""
+    strings = _Strings()
+    names = list(sheets)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        for n, name in enumerate(names, start=1):
+            zf.writestr(f"xl/worksheets/sheet{n}.xml", _sheet_xml(sheets[name], strings))
+        zf.writestr("[Content_Types].xml", _CONTENT_TYPES.format(
+            sheets="\n".join(_SHEET_TYPE.format(n=n) for n in range(1, len(names) + 1))))
+        zf.writestr("_rels/.rels", _ROOT_RELS)
+        zf.writestr("xl/workbook.xml", _WORKBOOK.format(sheets="".join(
+            f'<sheet name="{escape(name)}" sheetId="{n}" r:id="rId{n}"/>' for n, name in enumerate(names, start=1))))
+        zf.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS.format(
+            rels="\n".join(_SHEET_REL.format(n=n) for n in range(1, len(names) + 1)), strings=len(names) + 1))
+        zf.writestr("xl/sharedStrings.xml", strings.xml())
+
+
+def _names(rng, count):
+    # Distinct place-like words ("Dhamonpur"); a numeric suffix once the syllables run out
+    seen = set()
+    names = []
+    while len(names) < count:
+        word = "".join(rng.choice(SYLLABLES, size=rng.integers(2, 4))).title()
+        if word in seen:
+            word = f"{word} {len(names)}"
+        seen.add(word)
+        names.append(word)
+    return names
+
+
+def sheets(feeders=FEEDERS, substations=SUBSTATIONS, months=MONTHS, seed=0):
+    """``{sheet name: rows}`` of a synthetic workbook."""
+    rng = np.random.default_rng(seed)
+    nocs = list(nocs_mapping)
+    ss_names = [f"{w} 33/11KV S/S" for w in _names(rng, substations)]
+    ss_nocs = [nocs[i % len(nocs)] for i in range(substations)]
+    past = [CURRENT - k for k in range(1, months + 1)]
+
+    # Feeder rows: substation per row, and a typical consumption per feeder with a seasonal swing
+    ss = np.sort(rng.integers(0, substations, feeders))
+    base = rng.lognormal(13.5, 0.8, feeders)
+    season = 1 + 0.25 * np.sin(np.arange(months + 1) * np.pi / 6)
+    history = base[:, None] * season[None, :] * rng.normal(1, 0.05, (feeders, months + 1))
+    # Newer feeders have fewer past months
+    history[np.arange(months + 1)[None, :] > rng.integers(3, months + 8, feeders)[:, None]] = np.nan
+    omf = rng.choice(OMF, feeders).astype(np.float64)
+    cf = np.where(rng.random(feeders) < 0.05, rng.choice([1.35, 1.38, 1.45, 1.5], feeders), 1.0)
+    difference = np.round(history[:, 0] / omf / cf, 2)
+    opening = np.round(rng.random(feeders) * 10**7, 2)
+    consumption = np.round(difference * omf * cf)
+    corrected = consumption * rng.normal(1.002, 0.002, feeders)
+    unassigned = rng.random(feeders) < 0.1
+    feeder_words = _names(rng, min(feeders, 5000))
+
+    linked = [LINKED_COLUMNS + [f"{p.strftime('%B%y')}_Consumption" for p in past]]
+    for i in range(feeders):
+        name = f"11 kV {feeder_words[i % len(feeder_words)]} Feeder"
+        linked.append([i + 1, name, int(rng.integers(10000, 30000)), f"C{i:05d}", 11, 0, f"HA{i:09d}-02",
+                       float(cf[i]), float(opening[i]), float(opening[i] + difference[i]), float(difference[i]),
+                       float(omf[i]), 0, float(consumption[i]), float(corrected[i]),
+                       0 if unassigned[i] else ss_nocs[ss[i]], ss_names[ss[i]], int(ss[i]) + 1]
+                      + [float(v) for v in history[i, 1:]])
+
+    listing = [[None, "NOCS"], [None, len(nocs), "Substation_Name"]]
+    for i in range(max(len(nocs), substations)):
+        row = [f"A{i + 1}-{nocs[i]}", nocs[i]] if i < len(nocs) else [None, None]
+        if i < substations:
+            row += [ss_names[i], i + 1]
+        listing.append(row)
+
+    months_header = [f"{p.strftime('%B-%Y')}\n% of Loss" for p in [CURRENT] + past]
+    loss = [[None] * 4, [None, None, "Name of S/S", "Page"] + months_header]
+    ratios = np.round(rng.uniform(1, 8, (substations, months + 1)), 2)
+    for i, name in enumerate(ss_names):
+        loss.append([None, None, name, i + 1] + [float(v) for v in ratios[i]])
+
+    return {"Linked_11KV": linked, "SS List": listing, "%Loss ": loss}
+
+
+def generate(path, feeders=FEEDERS, substations=SUBSTATIONS, months=MONTHS, seed=0):
+    """Write a synthetic workbook to ``path`` and return ``path``."""
+    write_xlsx(path, sheets(feeders, substations, months, seed))
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--feeders", type=int, default=FEEDERS)
+    parser.add_argument("--substations", type=int, default=SUBSTATIONS)
+    parser.add_argument("--months", type=int, default=MONTHS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate(args.path, args.feeders, args.substations, args.months, args.seed)
+
+
+if __name__ == "__main__":
+    main()
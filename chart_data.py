@@ -0,0 +1,103 @@
+"""Chart-ready frames: aggregated to the level shown, small items collapsed.
+
+Plotly Express puts every row it is given into the figure JSON, so handing
+it one row per feeder makes the payload grow with the feeder count. The
+functions here sum the rows per displayed item first and fold whatever
+would not be readable anyway (beyond the ``limit`` largest items of a
+parent, or under ``min_share`` of it) into one "Other (n)" item per
+parent. A chart then carries at most ``limit + 1`` items per parent,
+however many feeders are behind it.
+
+Nothing here imports Streamlit or Plotly.
+"""
+import pandas as pd
+
+# Items per parent before the rest goes into "Other"
+MAX_ITEMS = 25
+# Leaves of a whole treemap/sunburst, shared out between their parents
+MAX_LEAVES = 200
+# In treemaps and sunbursts, items below this share of their parent go into "Other" ...
+MIN_SHARE = 0.005
+# ... except the largest few, so a level of many equal slivers still shows its top items
+MIN_ITEMS = 5
+OTHER = "Other"
+
+
+def _kept(items, value, group, limit, min_share):
+    # Which rows of ``items`` (one per item, ``group`` numbering their parents) stay themselves
+    size = items[value].abs()
+    groups = size.groupby(group)
+    total = groups.transform("sum")
+    rank = groups.rank(ascending=False, method="first")
+    keep = (rank <= limit) & ((size >= min_share * total) | (total == 0) | (rank <= MIN_ITEMS))
+    # Folding a single item gains nothing
+    return keep | ((~keep).groupby(group).transform("sum") == 1)
+
+
+def _group(items, by):
+    return items.groupby(by, sort=False, observed=True, dropna=False).ngroup() if by else \
+        pd.Series(0, index=items.index)
+
+
+def collapse(frame, label, value, by=(), limit=MAX_ITEMS, min_share=0.0, carry=()):
+    """``frame`` summed per ``(*by, label)`` with the small items of each ``by`` group folded.
+
+    Items are ranked by absolute value. Within each group the ``limit``
+    largest items at or above ``min_share`` of the group's absolute total
+    (but always the ``MIN_ITEMS`` largest) are kept; the rest become one row labelled ``"Other (n)"``. ``carry``
+    columns keep their first value per item (``OTHER`` on folded rows).
+    The result has the ``by``, ``label``, ``carry`` and ``value`` columns
+    plus ``Items``, the number of source items behind each row. Groups
+    keep their order of appearance; within a group rows go by size, with
+    "Other" last.
+    """
+    by, carry = list(by), list(carry)
+    items = frame.groupby(by + [label], sort=False, observed=True, dropna=False).agg(
+        **{value: (value, "sum")}, **{c: (c, "first") for c in carry}).reset_index()
+    items["Items"] = 1
+    items["_group"] = _group(items, by)
+    items["_size"] = items[value].abs()
+    keep = _kept(items, value, items["_group"], limit, min_share)
+    kept, folded = items[keep].assign(_other=0), items[~keep]
+    if len(folded):
+        other = folded.groupby("_group", sort=False).agg(
+            **{c: (c, "first") for c in by}, **{value: (value, "sum"), "Items": ("Items", "sum")}).reset_index()
+        other[label] = [f"{OTHER} ({n})" for n in other["Items"]]
+        for c in carry:
+            other[c] = OTHER
+        other["_size"] = other[value].abs()
+        kept = pd.concat([kept, other.assign(_other=1)[kept.columns]], ignore_index=True)
+    kept = kept.sort_values(["_group", "_other", "_size"], ascending=[True, True, False], kind="stable")
+    return kept[by + [label] + carry + [value, "Items"]].reset_index(drop=True)
+
+
+def hierarchy(frame, path, value, depth=None, limit=MAX_ITEMS, leaves=MAX_LEAVES, min_share=MIN_SHARE):
+    """Rows for a treemap/sunburst over ``path[:depth]``, one per leaf.
+
+    Every level is folded like ``collapse``, top down: the small parents
+    of a level become one "Other (n)" parent whose children are summed into
+    a single "Other" leaf, so no level carries more than ``limit + 1``
+    items per parent. The leaf level shares ``leaves`` items out between
+    its parents (at least ``MIN_ITEMS`` each), so the chart stays about the
+    same size however many rows are behind it.
+    """
+    path = list(path)[:depth]
+    frame = frame[path + [value]]
+    for i, level in enumerate(path[:-1]):
+        items = frame.groupby(path[:i + 1], sort=False, observed=True, dropna=False)[value].sum().reset_index()
+        group = _group(items, path[:i])
+        keep = _kept(items, value, group, limit, min_share)
+        if keep.all():
+            continue
+        folded = items[~keep]
+        count = (~keep).groupby(group).sum()
+        # Rows under a folded parent: "Other (n)" at this level, "Other" below it
+        row_keys = pd.MultiIndex.from_frame(frame[path[:i + 1]])
+        under = row_keys.isin(pd.MultiIndex.from_frame(folded[path[:i + 1]]))
+        labels = pd.Series(group[~keep].map(count).to_numpy(), index=pd.MultiIndex.from_frame(folded[path[:i + 1]]))
+        frame = frame.copy()
+        frame.loc[under, level] = [f"{OTHER} ({n})" for n in labels.reindex(row_keys[under]).to_numpy()]
+        frame.loc[under, path[i + 1:]] = OTHER
+    parents = len(frame.drop_duplicates(path[:-1])) if len(path) > 1 else 1
+    limit = min(limit, max(MIN_ITEMS, leaves // max(1, parents)))
+    return collapse(frame, path[-1], value, by=path[:-1], limit=limit, min_share=min_share)
@@ -0,0 +1,347 @@
+"""Headless energy-balance computations.
+
+``FeederData`` is one load of the Linked_11KV feeder table with its
+drill-down indexes and the feeder x month store. ``EnergyBalance`` holds the
+figures of one month. Every output is computed on first access and then
+kept, so the dashboard, the batch export and any script read the same
+numbers without re-running the pipeline, and a rerun for a month that has
+already been shown is a dictionary lookup.
+
+Nothing here imports Streamlit or Plotly.
+"""
+import os
+import threading
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from hierarchy import SS_LIST_SHEET, Registry, canonical, read_listing
+from ingest import HISTORY_DIR, History
+from losses import LOSS_SHEET, LossModel, parse_loss_sheet, read_loss_history
+from partition import PartitionIndex
+from search import SearchIndex
+from snapshot import current_sheet, current_snapshot, load_sheet, read_snapshot, snapshot_path
+from timeseries import MonthlyStore
+from validation import flag_table, outliers
+
+# Columns of the feeder table that describe the current month's meter readings only
+CURRENT_READINGS = ["CF", "Opening_Reading", "Closing_Reading", "Difference", "OMF"]
+
+# One FeederData is shared by every session of a process. Its numeric
+# columns are the snapshot's read-only memory maps, which the processes of
+# a deployment share through the page cache; text columns, the indexes and
+# the month store are one copy per process. With copy-on-write, slices and
+# column selections handed to a session are views, a session that does
+# modify a frame gets its own copy instead of changing the shared one, and
+# (from pandas 2) the arrays a frame hands out are read-only views or
+# copies. pandas >= 3 always works this way; 1.5/2.x need the option.
+if int(pd.__version__.split(".")[0]) < 3:
+    try:
+        pd.set_option("mode.copy_on_write", True)
+    except KeyError:
+        pass
+
+
+def feeder_rows(df):
+    """The feeder table as ``FeederData`` serves it: NOCS == 0 rows dropped, each substation's feeders together.
+
+    Substations keep the order they first appear in and feeders their order
+    within a substation. Snapshots of the feeder table are written in this
+    layout, so for them this returns ``df`` itself.
+    """
+    keep = (df["NOCS"] != 0).to_numpy()
+    codes = pd.factorize(df["Substation_Name"].map(canonical))[0]
+    order = np.flatnonzero(keep)[np.argsort(codes[keep], kind="stable")]
+    if len(order) == len(df) and np.array_equal(order, np.arange(len(df))):
+        return df
+    return df.take(order).reset_index(drop=True)
+
+
+# Where the feeder table lives in the monthly workbook, and how its snapshot is laid out.
+SHEET = dict(sheet_name="Linked_11KV", usecols="B:AH", nrows=1226, layout=feeder_rows)
+
+
+def read_only(array):
+    """Mark ``array`` (and so every view of it) as immutable and return it."""
+    array.flags.writeable = False
+    return array
+
+
+def snapshot_dir(workbook="EB.xlsx"):
+    """The snapshot to serve.
+
+    With ``EB_SNAPSHOT_DIR`` set (multi-worker deployments) this is the
+    snapshot published there by ``python snapshot.py EB.xlsx --publish``;
+    workers never parse the workbook themselves (``loss_history`` and
+    ``listing`` read the sheets published with it). Otherwise the snapshot of
+    ``workbook`` is built on demand.
+    """
+    shared = os.environ.get("EB_SNAPSHOT_DIR")
+    if shared:
+        target = current_snapshot(shared)
+        if target is None:
+            raise FileNotFoundError(f"no snapshot published in {shared}; run "
+                                    f"python snapshot.py {workbook} --publish --cache-dir {shared}")
+        return target
+    return snapshot_path(workbook, **SHEET)
+
+
+def _or_none(read, workbook):
+    try:
+        return read(workbook)
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _read_listing(workbook):
+    return read_listing(load_sheet(workbook, **SS_LIST_SHEET))
+
+
+def _published(sheet, parse):
+    # In shared mode a sheet is read from its snapshot published with the feeder table, never from the workbook
+    target = current_sheet(sheet["sheet_name"], os.environ["EB_SNAPSHOT_DIR"])
+    return None if target is None else _or_none(lambda path: parse(read_snapshot(path)), target)
+
+
+def loss_history(workbook="EB.xlsx"):
+    """``losses.read_loss_history`` of ``workbook``, or of the sheet published with the snapshot in shared mode.
+
+    ``None`` if there is none; loss figures are then unavailable.
+    """
+    if os.environ.get("EB_SNAPSHOT_DIR"):
+        return _published(LOSS_SHEET, parse_loss_sheet)
+    return _or_none(read_loss_history, workbook)
+
+
+def listing(workbook="EB.xlsx"):
+    """``hierarchy.Listing`` of the "SS List" sheet of ``workbook``, or as published with the snapshot in shared mode.
+
+    ``None`` if there is none; the registry then only knows
+    ``nocs_mapping`` and the substations of the feeder table.
+    """
+    if os.environ.get("EB_SNAPSHOT_DIR"):
+        return _published(SS_LIST_SHEET, read_listing)
+    return _or_none(_read_listing, workbook)
+
+
+def month_history():
+    """The ``ingest.History`` in ``EB_HISTORY_DIR`` (default ``.eb_history``), or ``None`` if none has been built."""
+    path = os.environ.get("EB_HISTORY_DIR", HISTORY_DIR)
+    return History(path) if os.path.isdir(os.path.join(path, "months")) else None
+
+
+def loss_percent(consumption, corrected):
+    """Loss between metered and corrected consumption, in percent (NaN for 0 kWh)."""
+    return (corrected - consumption) / consumption * 100 if consumption else float("nan")
+
+
+class FeederData:
+    """The feeder table (``feeder_rows``) and everything indexed on it.
+
+    Loaded from a snapshot, ``df`` holds the snapshot's memory-mapped numeric
+    columns, and substation drill-downs are slices of them.
+    """
+
+    def __init__(self, df, version=None, loss_history=None, listing=None, history=None):
+        # ``version`` names the data snapshot (its directory name, a content hash)
+        self.version = version
+        self.loss_history = loss_history
+        df = feeder_rows(df)
+        # Ids for every level from the SS List sheet and the table itself
+        self.registry = Registry(listing, df)
+        # NOCS/Circle/Zone/Substation as categoricals; every aggregation works on their codes
+        self.df = self.registry.attach(df)
+        self.index = {
+            "substation": PartitionIndex(self.df, "Substation"),
+            "nocs": PartitionIndex(self.df, "NOCS"),
+        }
+        self.monthly = MonthlyStore.from_frame(self.df)
+        if history is not None:
+            # Months older than the workbook's history columns, from ``python ingest.py``
+            self.monthly = history.extend(self.monthly, self.registry.feeder_keys(self.df))
+        self._balances = {}
+        self._lock = threading.Lock()
+        self._freeze()
+
+    def _freeze(self):
+        """Make the arrays of the indexes and the store read-only; sessions only ever get views of them.
+
+        ``df`` needs nothing: its numeric columns are mapped read-only (and
+        with copy-on-write ``to_numpy()`` hands out read-only views of any
+        frame's numeric columns), a text column's ``to_numpy()`` is a copy.
+        """
+        for index in self.index.values():
+            for array in (index.order, index.offsets, index.contiguous, *index.totals.values()):
+                read_only(array)
+        for array in (self.monthly.values, self.monthly.substation_codes, self.monthly.nocs_codes):
+            read_only(array)
+
+    @classmethod
+    def from_snapshot(cls, path, loss_history=None, listing=None, history=None):
+        return cls(read_snapshot(path), version=os.path.basename(os.path.normpath(path)),
+                   loss_history=loss_history, listing=listing, history=history)
+
+    @classmethod
+    def load(cls, workbook="EB.xlsx"):
+        return cls.from_snapshot(snapshot_dir(workbook), loss_history=loss_history(workbook),
+                                 listing=listing(workbook), history=month_history())
+
+    @classmethod
+    def from_workbook(cls, workbook):
+        """``workbook`` itself, also when a published snapshot is being served (``EB_SNAPSHOT_DIR``)."""
+        return cls.from_snapshot(snapshot_path(workbook, **SHEET),
+                                 loss_history=_or_none(read_loss_history, workbook),
+                                 listing=_or_none(_read_listing, workbook))
+
+    @property
+    def months(self):
+        """Month labels, newest first."""
+        return self.monthly.labels
+
+    @cached_property
+    def outliers(self):
+        """Feeders x months: consumption far outside the feeder's own history."""
+        return read_only(outliers(self.monthly.values))
+
+    @cached_property
+    def search(self):
+        """``SearchIndex`` over the NOCS, substation and feeder names."""
+        return SearchIndex.from_data(self)
+
+    @cached_property
+    def losses(self):
+        """``LossModel`` joining the loss history to the feeders (``None`` without a history)."""
+        return None if self.loss_history is None else LossModel(self, self.loss_history)
+
+    def balance(self, month=None):
+        """The ``EnergyBalance`` of ``month`` (default: latest), built once."""
+        month = month or self.monthly.latest
+        with self._lock:
+            balance = self._balances.get(month)
+            if balance is None:
+                balance = self._balances[month] = EnergyBalance(self, month)
+        return balance
+
+
+class EnergyBalance:
+    """Feeder, substation, NOCS, Circle and Zone figures of one month."""
+
+    def __init__(self, data, month):
+        self.data = data
+        self.month = month
+        self._drill_down = {}
+        self._table = {}
+
+    @property
+    def is_latest(self):
+        return self.month == self.data.monthly.latest
+
+    @cached_property
+    def month_values(self):
+        """Corrected consumption of every feeder, aligned with ``data.df``."""
+        return self.data.monthly.column(self.month)
+
+    # ---- totals ----
+    @cached_property
+    def total(self):
+        return round(float(np.nansum(self.month_values)))
+
+    @cached_property
+    def month_delta(self):
+        return round(float(np.nansum(self.data.monthly.delta(self.month))))
+
+    @cached_property
+    def rolling_12(self):
+        return round(float(self.data.monthly.rolling_total(self.month, 12).sum()))
+
+    # ---- hierarchy ----
+    @cached_property
+    def nocs(self):
+        """NOCS totals (rounded) with their Circle and Zone."""
+        return self.data.registry.nocs_summary(self.data.df, "Corrected_Consumption", decimals=0,
+                                               values=self.month_values)
+
+    @cached_property
+    def by_zone(self):
+        """``nocs`` ordered by Zone and Circle, as the summary report lists it."""
+        return self.nocs.sort_values(by=["Zone", "Circle"])
+
+    @cached_property
+    def totals(self):
+        """``Rollup`` of the NOCS totals over Circle and Zone."""
+        return self.data.registry.rollup(self.nocs["NOCS"], self.nocs["Corrected_Consumption"])
+
+    @cached_property
+    def substations(self):
+        """Consumption, corrected consumption and loss per substation.
+
+        Only the current month is metered; before it both columns carry the
+        corrected figure and the loss is NaN.
+        """
+        index = self.data.index["substation"]
+        if self.is_latest:
+            consumption = index.totals["Consumption"]
+            corrected = index.totals["Corrected_Consumption"]
+        else:
+            consumption = corrected = index.sums(self.month_values)
+        frame = pd.DataFrame({
+            "Substation_Name": index.keys(),
+            "Consumption": consumption,
+            "Corrected_Consumption": corrected,
+        })
+        if self.is_latest:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                frame["Loss"] = np.where(consumption != 0, (corrected - consumption) / consumption * 100, np.nan)
+        else:
+            frame["Loss"] = np.nan
+        return frame
+
+    # ---- losses ----
+    @cached_property
+    def losses(self):
+        """``losses.Losses`` of the month: every level ranked by loss, with last month's loss."""
+        model = self.data.losses
+        return None if model is None else model.month(self.month)
+
+    # ---- validation ----
+    @cached_property
+    def flags(self):
+        """``validation.flag_table`` of the month; reading checks only for the latest month."""
+        column = self.data.outliers[:, self.data.monthly.position(self.month)]
+        return flag_table(self.data.df, self.month_values, column, readings=self.is_latest)
+
+    # ---- drill-downs ----
+    def drill_down(self, kind, key):
+        """Rows of one substation/NOCS plus its Consumption and Corrected_Consumption totals.
+
+        Before the current month the rows carry that month's figure and no
+        meter readings (``CURRENT_READINGS`` are NaN).
+        """
+        found = self._drill_down.get((kind, key))
+        if found is None:
+            index = self.data.index[kind]
+            rows = index.rows(key)
+            if self.is_latest:
+                found = rows, index.total(key, "Consumption"), index.total(key, "Corrected_Consumption")
+            else:
+                # Earlier months only have the corrected figure; it stands in for both columns. The
+                # meter readings are the current month's, so they are blanked rather than shown beside it
+                values = np.nan_to_num(self.month_values[index.positions(key)])
+                total = float(values.sum())
+                blank = {column: np.nan for column in CURRENT_READINGS if column in rows.columns}
+                found = rows.assign(Consumption=values, Corrected_Consumption=values, **blank), total, total
+            self._drill_down[(kind, key)] = found
+        return found
+
+    def table(self, kind, key):
+        """Drill-down rows with whole-kWh consumption, as tables and reports show them.
+
+        Built once per key and shared, like ``drill_down``.
+        """
+        found = self._table.get((kind, key))
+        if found is None:
+            rows = self.drill_down(kind, key)[0]
+            found = self._table[(kind, key)] = rows.fillna({"Consumption": 0, "Corrected_Consumption": 0}).astype(
+                {"Consumption": int, "Corrected_Consumption": int})
+        return found
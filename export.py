@@ -0,0 +1,137 @@
+"""Month-end energy balance as CSV, Parquet or JSON, without the dashboard.
+
+For every workbook this loads the feeder table once (through the columnar
+snapshot, like the dashboard) and writes the figures the dashboard shows:
+
+    summary              total, change from the previous month, 12-month total
+    zone, circle, nocs   the Zone / Circle / NOCS balance of the html table
+    substations          consumption, corrected consumption and loss per substation
+    loss_<level>         import, sales and technical loss per substation, NOCS,
+                         Circle and Zone (when the workbook has a "%Loss " sheet)
+
+Every table starts with a ``Month`` column; ``--all-months`` stacks every
+month of the workbook. CSV and Parquet give one file per table under
+``<output>/<workbook name>/``, JSON one ``<output>/<workbook name>.json``
+holding all tables. A directory argument means every .xlsx in it, spread
+over a process pool.
+
+Only the engine is imported (no Streamlit, Plotly or FPDF), so a run
+starts in about the time it takes to import pandas.
+
+Usage: ``python export.py EB.xlsx|DIR ... [-o balance] [--format csv|parquet|json]
+[--month "June-2024" | --all-months] [--jobs 4]``
+"""
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from engine import FeederData
+from xlsx_reader import workbooks
+
+FORMATS = ("csv", "parquet", "json")
+
+
+def tables(balance):
+    """``{name: frame}`` of one month's balance, each frame led by a ``Month`` column."""
+    nocs = balance.by_zone[["Zone", "Circle", "NOCS", "Corrected_Consumption"]].reset_index(drop=True)
+    found = {
+        "summary": pd.DataFrame({"Total": [balance.total], "Month_Delta": [balance.month_delta],
+                                 "Rolling_12": [balance.rolling_12]}),
+        "zone": nocs.groupby("Zone", sort=False)["Corrected_Consumption"].sum().reset_index(),
+        "circle": nocs.groupby(["Zone", "Circle"], sort=False)["Corrected_Consumption"].sum().reset_index(),
+        "nocs": nocs,
+        "substations": balance.substations,
+    }
+    if balance.losses is not None:
+        for level, frame in balance.losses._asdict().items():
+            found["loss_" + level] = frame
+    return {name: frame.assign(Month=balance.month)[["Month", *frame.columns]] for name, frame in found.items()}
+
+
+def write(found, target, fmt="csv"):
+    """Write ``{name: frame}`` as ``fmt`` to ``target`` (a directory, or ``target.json``); returns the paths."""
+    if fmt == "json":
+        path = target + ".json"
+        body = ",".join(f'"{name}":{frame.to_json(orient="records")}' for name, frame in found.items())
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write("{" + body + "}")
+        return [path]
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format {fmt!r}")
+    os.makedirs(target, exist_ok=True)
+    paths = []
+    for name, frame in found.items():
+        path = os.path.join(target, f"{name}.{fmt}")
+        if fmt == "csv":
+            frame.to_csv(path, index=False)
+        else:
+            frame.to_parquet(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def export_workbook(workbook, out="balance", fmt="csv", month=None, all_months=False):
+    """Write the balance of ``workbook``; returns ``(workbook, months, paths)``."""
+    data = FeederData.from_workbook(workbook)
+    if month is not None and month not in data.months:
+        raise ValueError(f"no {month} column (latest is {data.monthly.latest})")
+    balances = [data.balance(m) for m in data.months] if all_months else [data.balance(month)]
+    months = [balance.month for balance in balances]
+    per_month = [tables(balance) for balance in balances]
+    found = {name: pd.concat([t[name] for t in per_month if name in t], ignore_index=True)
+             for name in per_month[0]}
+    target = os.path.join(out, os.path.splitext(os.path.basename(workbook))[0])
+    os.makedirs(out, exist_ok=True)
+    return workbook, months, write(found, target, fmt)
+
+
+def _export(task):
+    workbook, options = task
+    try:
+        return export_workbook(workbook, **options), None
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile) as exc:
+        return (workbook, [], []), exc
+
+
+def export_all(paths, out="balance", fmt="csv", month=None, all_months=False, jobs=None):
+    """Export every workbook of ``paths``, one per process (in-process for one workbook or ``jobs=1``).
+
+    Yields ``((workbook, months, paths), error)`` as workbooks finish; a
+    workbook that fails does not stop the others.
+    """
+    todo = [(workbook, dict(out=out, fmt=fmt, month=month, all_months=all_months)) for workbook in workbooks(paths)]
+    if jobs == 1 or len(todo) <= 1:
+        yield from map(_export, todo)
+        return
+    with ProcessPoolExecutor(max_workers=min(jobs or os.cpu_count(), len(todo))) as pool:
+        yield from pool.map(_export, todo)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    import time
+
+    parser = argparse.ArgumentParser(description="Write the month-end energy balance of workbooks as files.")
+    parser.add_argument("workbooks", nargs="*", default=["EB.xlsx"], help="workbooks or directories of workbooks")
+    parser.add_argument("-o", "--output", default="balance")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    when = parser.add_mutually_exclusive_group()
+    when.add_argument("--month", help='month label as in the dashboard, e.g. "June-2024" (default: latest)')
+    when.add_argument("--all-months", action="store_true", help="every month the workbook holds")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    t0 = time.perf_counter()
+    failed = 0
+    for (workbook, months, paths), error in export_all(args.workbooks, args.output, args.format, args.month,
+                                                        args.all_months, args.jobs):
+        if error is not None:
+            failed += 1
+            print(f"{workbook}: {error}", file=sys.stderr)
+        else:
+            span = months[0] if len(months) == 1 else f"{months[-1]} .. {months[0]}"
+            print(f"{workbook} ({span}) -> {len(paths)} file(s) in {os.path.dirname(paths[0]) or '.'}")
+    print(f"done in {time.perf_counter() - t0:.1f}s")
+    sys.exit(1 if failed else 0)
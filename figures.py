@@ -0,0 +1,109 @@
+"""The dashboard's figures and its Zone/Circle/NOCS HTML table.
+
+Each builder takes the frames of an ``EnergyBalance`` and returns a Plotly
+figure (or the HTML string); app.py memoizes and draws them, and
+benchmarks/bench_pipeline.py times the same builders. The per-feeder
+charts go through ``chart_data`` first, so a figure carries the items shown
+rather than every feeder.
+
+Nothing here imports Streamlit.
+"""
+import plotly.express as px
+
+from chart_data import collapse, hierarchy
+
+SCALE = ["red", "yellow", "green"]
+
+
+def _treemap(nocs, path, color, title):
+    fig = px.treemap(nocs, path=path, values=nocs["Corrected_Consumption"], color=nocs[color],
+                     color_continuous_scale=SCALE, title=title, width=1000, height=700)
+    fig.update_layout(font_size=15, title_font_size=30, title_font_family="Arial")
+    fig.update_traces(textinfo="label+value")
+    return fig
+
+
+def nocs_treemap(nocs):
+    """NOCS treemap of ``EnergyBalance.nocs``."""
+    return _treemap(nocs, ["NOCS"], "NOCS", "NOCS-Wise Summary of Import")
+
+
+def zone_treemap(nocs):
+    """Zone -> Circle -> NOCS treemap of ``EnergyBalance.nocs``."""
+    return _treemap(nocs, ["Zone", "Circle", "NOCS"], "Circle", "Zone, Circle and NOCS-Wise Summary of Import")
+
+
+def nocs_bar(nocs):
+    """Consumption-by-NOCS bar chart of ``EnergyBalance.nocs``."""
+    fig = px.bar(nocs, y=nocs["Corrected_Consumption"], x=nocs["NOCS"], labels=nocs["Corrected_Consumption"],
+                 orientation="v", title="<b>Consumption by NOCS</b>", color="Corrected_Consumption",
+                 template="plotly_dark", text_auto=".4s", height=600)
+    fig.update_layout(font_size=15, title_font_size=30, title_font_family="Arial",
+                      plot_bgcolor="rgba(0,0,0,0)", xaxis=dict(showgrid=False))
+    fig.update_traces(textfont_size=45, textangle=-90, textposition="inside", cliponaxis=False)
+    return fig
+
+
+def feeder_sunburst(rows, path, depth=None):
+    """Sunburst of drill-down ``rows`` along ``path`` (ending in ``Feeder_Name``), down to ``depth`` levels.
+
+    Feeders without consumption are left out and negative ones drawn by
+    their absolute value.
+    """
+    depth = depth or len(path)
+    rows = rows[rows["Corrected_Consumption"] != 0]
+    rows = rows.assign(Corrected_Consumption=rows["Corrected_Consumption"].astype(int).abs())
+    rows = hierarchy(rows, path, "Corrected_Consumption", depth=depth)
+    fig = px.sunburst(rows, path=path[:depth], values=rows["Corrected_Consumption"], color=rows[path[0]],
+                      color_continuous_scale=SCALE, title="Feeder-wise Consumption", width=1500, height=800)
+    fig.update_layout(title_font_size=20, title_font_family="Arial")
+    fig.update_traces(textinfo="label+value")
+    return fig
+
+
+def feeder_bar(rows, color, height=600):
+    """Feeder bar chart of drill-down ``rows``, coloured by their ``color`` column."""
+    bars = collapse(rows, "Feeder_Name", "Corrected_Consumption", carry=[color])
+    fig = px.bar(bars, y="Corrected_Consumption", x="Feeder_Name", orientation="v",
+                 title="<b>Feeder Wise Consumption</b>", color=color, text_auto="0.2s", template="plotly_dark",
+                 height=height)
+    fig.update_layout(font_size=15, plot_bgcolor="rgba(0,0,0,0)", xaxis=dict(showgrid=False))
+    return fig
+
+
+def html_table(registry, totals):
+    """The Zone/Circle/NOCS table of ``totals`` (``Registry.rollup``), in the registry's order."""
+    rows = []
+    for zone, circles in registry.walk():
+        zone_span = sum(len(members) for _, members in circles)
+        for c, (circle, members) in enumerate(circles):
+            for n, nocs in enumerate(members):
+                cells = []
+                if c == 0 and n == 0:
+                    cells.append(f'<td class="tg-e23d" rowspan="{zone_span}">{zone}</td>')
+                    cells.append(f'<td class="Z_{zone}" rowspan="{zone_span}">{totals.zone[zone]}</td>')
+                if n == 0:
+                    cells.append(f'<td class="tg-e23d" rowspan="{len(members)}">{circle}</td>')
+                    cells.append(f'<td class="C_{circle}" rowspan="{len(members)}">{totals.circle[circle]}</td>')
+                cells.append(f'<td class="tg-ncgp">{nocs}</td>')
+                cells.append(f'<td class="N_{nocs}">{totals.nocs[nocs]}</td>')
+                rows.append("<tr>\n" + "\n".join(cells) + "\n</tr>")
+    return f"""
+<center>
+<table class="tg" bgcolor="#063970">
+<thead>
+<tr>
+<th class="tg-op08">Zone</th>
+<th class="tg-pl3c">Zone Total</th>
+<th class="tg-pl3c">Circle</th>
+<th class="tg-pl3c">Circle Total</th>
+<th class="tg-op08">NOCS</th>
+<th class="tg-pl3c">NOCS Total Import</th>
+</tr>
+</thead>
+<tbody>
+{chr(10).join(rows)}
+</tbody>
+</table>
+</center>
+"""
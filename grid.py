@@ -0,0 +1,85 @@
+"""Server-side paging, sorting and filtering of a table.
+
+The dashboard used to hand whole frames to ``st.write``, which ships every
+row to the browser. ``Grid`` keeps the frame on the server and hands out one
+page at a time; with Arrow serialization (``.streamlit/config.toml``) only
+that page is encoded and sent. Sort orders and the lower-cased text used by
+the filter are computed once per column and kept on the grid, so paging,
+re-sorting and filtering a table that has been shown before are index
+operations on the shared frame. ``nbytes`` counts them, so the memo holding
+a grid can account for what it grows to.
+
+Nothing here imports Streamlit.
+"""
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+PAGE_SIZES = (25, 50, 100, 500)
+
+Page = namedtuple("Page", ["rows", "number", "pages", "start", "total"])
+
+
+class Grid:
+    def __init__(self, frame):
+        self.frame = frame
+        self._orders = {}
+        self._text = None
+        self._text_bytes = 0
+        self._frame_bytes = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def nbytes(self):
+        """Memory held by the frame, the sort orders and the filter text built so far."""
+        if self._frame_bytes is None:
+            self._frame_bytes = int(self.frame.memory_usage(deep=True).sum())
+        return self._frame_bytes + sum(order.nbytes for order in self._orders.values()) + self._text_bytes
+
+    @property
+    def columns(self):
+        return list(self.frame.columns)
+
+    def _order(self, column, ascending):
+        """Row positions sorted by ``column`` (missing values last), built once."""
+        key = (column, ascending)
+        order = self._orders.get(key)
+        if order is None:
+            values = self.frame[column].reset_index(drop=True)
+            order = values.sort_values(ascending=ascending, kind="stable", na_position="last").index.to_numpy()
+            with self._lock:
+                self._orders[key] = order
+        return order
+
+    def _haystack(self):
+        # Every row as one lower-case string, so a filter is one vectorised substring test
+        if self._text is None:
+            text = np.full(len(self.frame), "", dtype=object)
+            for col in self.frame.columns:
+                # Blank cells match nothing rather than "nan"
+                cells = self.frame[col].astype(object).fillna("")
+                text = text + "\x1f" + cells.to_numpy(dtype=object).astype(str).astype(object)
+            self._text = pd.Series(text, dtype=object).str.lower()
+            self._text_bytes = int(self._text.memory_usage(deep=True))
+        return self._text
+
+    def view(self, sort=None, ascending=True, query=None):
+        """Positions of the rows matching ``query`` (any cell contains it), in ``sort`` order."""
+        positions = np.arange(len(self.frame)) if sort is None else self._order(sort, ascending)
+        if query:
+            mask = self._haystack().str.contains(query.lower(), regex=False).to_numpy()
+            positions = positions[mask[positions]]
+        return positions
+
+    def page(self, number=0, size=100, sort=None, ascending=True, query=None):
+        """``Page`` ``number`` (clamped to the last page) of the sorted, filtered rows."""
+        positions = self.view(sort, ascending, query)
+        pages = max(1, -(-len(positions) // size))
+        number = min(max(0, number), pages - 1)
+        start = number * size
+        return Page(self.frame.iloc[positions[start:start + size]], number, pages, start, len(positions))
@@ -0,0 +1,308 @@
+"""Zone -> Circle -> NOCS -> Substation -> Feeder registry and the rollups over it.
+
+``Registry`` gives every Zone, Circle, NOCS, substation and feeder of one
+data load an integer id and looks names up by a canonical key, so
+spellings that differ only in case, spacing, punctuation or "KV"/"S/S"
+resolve to the same id. NOCS and substations come from the workbook's
+"SS List" sheet plus whatever the feeder table contains; a new substation
+in the workbook is picked up on the next load. The workbook does not say
+which Circle and Zone a NOCS belongs to; that is ``nocs_mapping`` below.
+"""
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Create a dictionary to map "NOCS" to "Circle" and "Zone"
+nocs_mapping = {
+    "Tejgaon": ("Tejgaon", "North"),
+    "Kakrail": ("Tejgaon", "North"),
+    "Moghbazar": ("Moghbazar", "North"),
+    "Khilgaon": ("Moghbazar", "North"),
+    "Satmasjid": ("Satmasjid", "North"),
+    "Shere b.nagar": ("Satmasjid", "North"),
+    "Dhanmondi": ("Dhanmondi", "North"),
+    "Jigatola": ("Dhanmondi", "North"),
+    "Azimpur": ("Azimpur", "North"),
+    "Paribag": ("Azimpur", "North"),
+    "Shyamoli": ("Shyamoli", "North"),
+    "Adabor": ("Shyamoli", "North"),
+    "Lalbag": ("Lalbag", "Central"),
+    "Kamrangirchar": ("Lalbag", "Central"),
+    "Ramna": ("Ramna", "Central"),
+    "Rajarbag": ("Ramna", "Central"),
+    "Bashabo": ("Bashabo", "Central"),
+    "Banosree": ("Bashabo", "Central"),
+    "Motijheel": ("Motijheel", "Central"),
+    "Mugdapara": ("Motijheel", "Central"),
+    "Banglabazar": ("Banglabazar", "Central"),
+    "Bangshal": ("Banglabazar", "Central"),
+    "Narinda": ("Narinda", "Central"),
+    "Swamibag": ("Narinda", "Central"),
+    "Kazla": ("Kazla", "South"),
+    "Maniknagar": ("Kazla", "South"),
+    "Shyampur": ("Shyampur", "South"),
+    "Matuail": ("Shyampur", "South"),
+    "Postogola": ("Postogola", "South"),
+    "Jurain": ("Postogola", "South"),
+    "N.Gonj (West)": ("N.Gonj (West)", "South"),
+    "N.Gonj (East)": ("N.Gonj (West)", "South"),
+    "Demra": ("Demra", "South"),
+    "Siddirgonj": ("Demra", "South"),
+    "Fatullah": ("Fatullah", "South"),
+    "Sytalakhya": ("Fatullah", "South"),
+}
+
+UNKNOWN = "Unknown"
+LEVELS = ("zone", "circle", "nocs", "substation", "feeder")
+
+# Where the master lists live: NOCS (with their codes) in A:B, substations with their ids in C:D.
+SS_LIST_SHEET = dict(sheet_name="SS List", usecols="A:D", nrows=500)
+
+Rollup = namedtuple("Rollup", ["nocs", "circle", "zone"])
+Listing = namedtuple("Listing", ["nocs", "substations"])
+
+_NOISE = re.compile(r"kv|s/s|\bss\b")
+
+
+def canonical(name):
+    """Comparison key of a name: case, spacing, punctuation, "KV" and "S/S" ignored."""
+    return re.sub(r"[^a-z0-9]+", "", _NOISE.sub(" ", str(name).casefold()))
+
+
+def read_listing(frame):
+    """``Listing`` of the NOCS and substation names in an "SS List" sheet slice.
+
+    ``frame`` holds columns A:D positionally: NOCS rows carry a code such as
+    ``"A1-Motijheel"`` in A and the name in B; substation rows carry the
+    name in C and its number in D. Substations are returned in number order.
+    """
+    code, nocs, name, number = (frame.iloc[:, i].to_numpy(dtype=object) for i in range(4))
+    listed_nocs = [n.strip() for c, n in zip(code, nocs)
+                   if isinstance(c, str) and isinstance(n, str) and n.strip()]
+    numbered = pd.to_numeric(pd.Series(number), errors="coerce").to_numpy()
+    rows = [(numbered[i], " ".join(n.split())) for i, n in enumerate(name)
+            if isinstance(n, str) and n.strip() and not np.isnan(numbered[i])]
+    return Listing(listed_nocs, [n for _, n in sorted(rows, key=lambda r: r[0])])
+
+
+def _weights(values):
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(np.isnan(values), 0.0, values)
+
+
+class _Level:
+    """Names of one level in id order plus the canonical-key -> id map."""
+
+    def __init__(self, names):
+        self.names = pd.Index(list(names), dtype=object)
+        self.ids = {}
+        for i, name in enumerate(self.names):
+            self.ids.setdefault(canonical(name), i)
+
+    def __len__(self):
+        return len(self.names)
+
+    def lookup(self, names):
+        """Ids of ``names`` (-1 if unknown), resolving each distinct name once."""
+        codes, uniques = pd.factorize(pd.Series(np.asarray(names, dtype=object)))
+        found = np.array([self.ids.get(canonical(u), -1) for u in uniques], dtype=np.int64)
+        return np.where(codes >= 0, found[codes] if len(found) else -1, -1)
+
+
+class Registry:
+    """Ids and names of every level, with the NOCS -> Circle -> Zone parents as arrays.
+
+    NOCS, Circle and Zone ids follow sorted name order, so aggregations list
+    them alphabetically; each of the three dtypes ends in an "Unknown"
+    category that collects names the registry does not know. Substation ids
+    follow the "SS List" numbering, substations only found in the feeder
+    table come after. Feeder ids number the (substation, feeder) pairs of
+    the feeder table.
+    """
+
+    def __init__(self, listing=None, df=None, circles=nocs_mapping):
+        listed_nocs = list(circles) if listing is None else listing.nocs
+        nocs = sorted(set(circles) | {n for n in listed_nocs if canonical(n) not in
+                                      {canonical(c) for c in circles}})
+        zones = sorted({zone for _, zone in circles.values()})
+        circle_names = sorted({circle for circle, _ in circles.values()})
+        circle_of = {canonical(n): c for n, (c, _) in circles.items()}
+        zone_of = {circle: zone for circle, zone in circles.values()}
+
+        substations = [] if listing is None else list(listing.substations)
+        if df is not None:
+            substations += list(pd.unique(df["Substation_Name"].dropna().astype(str).str.split().str.join(" ")))
+        self._levels = {
+            "zone": _Level(zones),
+            "circle": _Level(circle_names),
+            "nocs": _Level(nocs),
+            "substation": _Level(_distinct(substations)),
+        }
+        self._listing = {"nocs": [self.name("nocs", self.id("nocs", n)) for n in listed_nocs if self.id("nocs", n) >= 0]}
+
+        # Parent arrays, with one trailing slot each for Unknown
+        self.nocs_circle = np.append(
+            self._levels["circle"].lookup([circle_of.get(canonical(n), UNKNOWN) for n in nocs]), -1)
+        self.nocs_circle[self.nocs_circle < 0] = len(circle_names)
+        self.circle_zone = np.append(self._levels["zone"].lookup([zone_of[c] for c in circle_names]), len(zones))
+        self.nocs_zone = self.circle_zone[self.nocs_circle]
+        self.nocs_dtype = pd.CategoricalDtype(pd.Index(nocs + [UNKNOWN], dtype=object))
+        self.circle_dtype = pd.CategoricalDtype(pd.Index(circle_names + [UNKNOWN], dtype=object))
+        self.zone_dtype = pd.CategoricalDtype(pd.Index(zones + [UNKNOWN], dtype=object))
+        self.substation_dtype = pd.CategoricalDtype(self._levels["substation"].names)
+
+        self.feeder_ids = None
+        if df is not None:
+            self.feeder_ids, pairs = self._feeders(df)
+            self._levels["feeder"] = _Level(pairs)
+
+    def _feeder_keys(self, df):
+        ss = self.ids("substation", df["Substation_Name"])
+        names = [canonical(n) for n in self.names("substation")]
+        feeders = df["Feeder_Name"].to_numpy(dtype=object)
+        keys = pd.Series([f"{names[s] if s >= 0 else ''}|{canonical(f)}" for s, f in zip(ss, feeders)], dtype=object)
+        nth = keys.groupby(keys).cumcount()
+        suffix = np.where(nth > 0, "#" + (nth + 1).astype(str), "")
+        return ss, feeders, suffix, (keys + suffix).to_numpy(dtype=object)
+
+    def feeder_keys(self, df):
+        """Key of every row of ``df``: canonical substation and feeder name; repeated names (spares) get "#n".
+
+        Keys do not depend on row order or ids, so they match a feeder across
+        monthly workbooks (``ingest.History``).
+        """
+        return self._feeder_keys(df)[3]
+
+    def _feeders(self, df):
+        # One id per distinct feeder key
+        ss, feeders, suffix, keys = self._feeder_keys(df)
+        ids, _ = pd.factorize(keys)
+        _, first = np.unique(ids, return_index=True)
+        names = self.names("substation")
+        pairs = [f"{names[ss[i]] if ss[i] >= 0 else ''}|{' '.join(str(feeders[i]).split())}{suffix[i]}" for i in first]
+        return ids, pairs
+
+    # ---- lookups (O(1) each way) ----
+    def __contains__(self, item):
+        level, name = item
+        return self.id(level, name) >= 0
+
+    def id(self, level, name):
+        """Id of ``name`` on ``level``; -1 if it is not registered."""
+        return self._levels[level].ids.get(canonical(name), -1)
+
+    def name(self, level, i):
+        """Registered name of id ``i`` on ``level``."""
+        return self._levels[level].names[i]
+
+    def ids(self, level, names):
+        """Vectorised ``id`` over a sequence of names."""
+        return self._levels[level].lookup(names)
+
+    def names(self, level):
+        """Names of ``level`` in id order."""
+        return self._levels[level].names
+
+    def listing(self, level):
+        """Names in the order selectors list them ("SS List" order for NOCS)."""
+        if level == "nocs" and self._listing["nocs"]:
+            return list(self._listing["nocs"])
+        return list(self._levels[level].names)
+
+    # ---- codes for the feeder table ----
+    def nocs_codes(self, nocs):
+        """Integer NOCS codes for ``nocs``; unregistered names get the Unknown code."""
+        if isinstance(nocs, pd.Series) and nocs.dtype == self.nocs_dtype:
+            return nocs.cat.codes.to_numpy()
+        codes = self.ids("nocs", nocs)
+        return np.where(codes < 0, len(self._levels["nocs"]), codes)
+
+    def attach(self, df):
+        """Return ``df`` with categorical NOCS, Circle, Zone and Substation columns.
+
+        NOCS names are resolved through the registry, Circle and Zone are
+        gathered from the NOCS codes with an array lookup, so the cost does
+        not depend on how many feeders share a NOCS. ``Substation`` is the
+        registered spelling of ``Substation_Name``, which keeps the
+        workbook's spelling.
+        """
+        codes = self.nocs_codes(df["NOCS"])
+        columns = dict(
+            NOCS=pd.Categorical.from_codes(codes, dtype=self.nocs_dtype),
+            Circle=pd.Categorical.from_codes(self.nocs_circle[codes], dtype=self.circle_dtype),
+            Zone=pd.Categorical.from_codes(self.nocs_zone[codes], dtype=self.zone_dtype),
+        )
+        if "Substation_Name" in df:
+            columns["Substation"] = pd.Categorical.from_codes(
+                self.ids("substation", df["Substation_Name"]), dtype=self.substation_dtype)
+        return df.assign(**columns)
+
+    # ---- aggregations ----
+    def nocs_summary(self, df, value="Corrected_Consumption", decimals=0, values=None):
+        """Per-NOCS totals of ``value`` with each NOCS's Circle and Zone.
+
+        ``values`` overrides ``df[value]`` with an aligned array (e.g. another
+        month's consumption). Only NOCS that occur in ``df`` are listed, in
+        id order, as plain string columns so the frame can go straight
+        into Plotly and the PDFs.
+        """
+        codes = self.nocs_codes(df["NOCS"])
+        size = len(self.nocs_dtype.categories)
+        weights = _weights(df[value] if values is None else values)
+        totals = np.bincount(codes, weights=weights, minlength=size)
+        present = np.flatnonzero(np.bincount(codes, minlength=size))
+        return pd.DataFrame({
+            "NOCS": np.asarray(self.nocs_dtype.categories[present], dtype=object),
+            value: totals[present].round(decimals),
+            "Circle": np.asarray(self.circle_dtype.categories[self.nocs_circle[present]], dtype=object),
+            "Zone": np.asarray(self.zone_dtype.categories[self.nocs_zone[present]], dtype=object),
+        })
+
+    def rollup(self, nocs, values, decimals=None):
+        """Total ``values`` per NOCS, Circle and Zone in a single pass.
+
+        ``nocs`` and ``values`` are aligned sequences (feeder rows or NOCS rows
+        alike). Unregistered NOCS names are ignored. With ``decimals`` the
+        NOCS totals are rounded first, so every Circle and Zone figure is
+        exactly the sum of the NOCS figures shown beneath it.
+        """
+        n_nocs, n_circles, n_zones = (len(self._levels[level]) for level in ("nocs", "circle", "zone"))
+        codes = self.nocs_codes(nocs)
+        known = codes < n_nocs
+        nocs_total = np.bincount(codes[known], weights=_weights(values)[known], minlength=n_nocs)
+        if decimals is not None:
+            nocs_total = nocs_total.round(decimals)
+        circle_total = np.bincount(self.nocs_circle[:-1], weights=nocs_total, minlength=n_circles + 1)[:n_circles]
+        zone_total = np.bincount(self.circle_zone[:-1], weights=circle_total, minlength=n_zones)
+        return Rollup(
+            nocs=pd.Series(nocs_total, index=self.names("nocs")),
+            circle=pd.Series(circle_total, index=self.names("circle")),
+            zone=pd.Series(zone_total, index=self.names("zone")),
+        )
+
+    def walk(self):
+        """Yield ``(zone, circles)`` with ``circles`` as ``[(circle, [nocs, ...]), ...]``."""
+        circles_of = self.circle_zone[:-1]
+        nocs_of = self.nocs_circle[:-1]
+        for z, zone in enumerate(self.names("zone")):
+            circles = []
+            for c in np.flatnonzero(circles_of == z):
+                circles.append((self.names("circle")[c], list(self.names("nocs")[nocs_of == c])))
+            yield zone, circles
+
+
+def _distinct(names):
+    # First spelling of every canonical key, in order
+    seen, out = set(), []
+    for name in names:
+        key = canonical(name)
+        if key and key not in seen:
+            seen.add(key)
+            out.append(name)
+    return out
+
+
+# The registry of ``nocs_mapping`` alone, for code that has no workbook at hand.
+DEFAULT = Registry()
@@ -0,0 +1,274 @@
+"""Incremental monthly ingestion into an on-disk energy-balance history.
+
+Every month a new EB.xlsx is published, and it only carries the last year
+or so of history columns. ``History.ingest`` keeps every month ever loaded:
+
+* feeders are matched by ``Registry.feeder_keys`` against an append-only
+  feeder registry;
+* the workbook's current month is written as one new month file; a month
+  already on disk (the same month published again) is diffed instead, each
+  change recorded as a delta and only that month file patched;
+* the workbook's history columns only seed months the history does not
+  have yet (the first run); later runs never re-read them;
+* NOCS/Circle/Zone totals per month are kept with ``Registry.rollup``,
+  updated from the new month or from the deltas instead of re-aggregating
+  the history.
+
+``History.extend`` adds the stored months a workbook no longer carries to
+its ``MonthlyStore``; ``engine.FeederData.load`` does so whenever a history
+has been built (``EB_HISTORY_DIR``, default ``.eb_history``).
+
+Layout of the history directory::
+
+    feeders.json          registry: key, substation, feeder, NOCS per feeder id
+    months/<YYYY-MM>.npz  feeder ids and figures for one month
+    rollups/<YYYY-MM>.json  NOCS/Circle/Zone totals for one month
+    deltas.jsonl          one line per corrected value
+
+Usage: ``python ingest.py EB.xlsx [--history .eb_history]``
+"""
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from snapshot import file_digest
+from timeseries import MonthlyStore, month_columns
+
+HISTORY_DIR = ".eb_history"
+
+# Month-file field -> Linked_11KV column for the workbook's current month.
+CURRENT_FIELDS = {
+    "opening": "Opening_Reading",
+    "closing": "Closing_Reading",
+    "cf": "CF",
+    "omf": "OMF",
+    "consumption": "Consumption",
+    "corrected": "Corrected_Consumption",
+}
+
+
+def _atomic_write(path, write):
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            write(fh)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _same(old, new):
+    return (old == new) | (np.isnan(old) & np.isnan(new))
+
+
+class History:
+    def __init__(self, path=HISTORY_DIR):
+        self.path = path
+        os.makedirs(os.path.join(path, "months"), exist_ok=True)
+        os.makedirs(os.path.join(path, "rollups"), exist_ok=True)
+        self.registry = self._load_registry()
+        self._ids = {f["key"]: i for i, f in enumerate(self.registry)}
+
+    # ---- registry ----
+    def _load_registry(self):
+        try:
+            with open(os.path.join(self.path, "feeders.json"), encoding="utf-8") as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            return []
+
+    def _save_registry(self):
+        data = json.dumps(self.registry, ensure_ascii=False).encode("utf-8")
+        _atomic_write(os.path.join(self.path, "feeders.json"), lambda fh: fh.write(data))
+
+    def feeder_ids(self, data):
+        """Registry ids for the rows of ``data.df`` (a ``FeederData``), registering new feeders."""
+        keys = data.registry.feeder_keys(data.df)
+        ids = np.empty(len(keys), dtype=np.int32)
+        changed = False
+        for row, (key, ss, feeder, nocs) in enumerate(zip(
+                keys, data.df["Substation"], data.df["Feeder_Name"], data.df["NOCS"])):
+            i = self._ids.get(key)
+            if i is None:
+                i = self._ids[key] = len(self.registry)
+                self.registry.append({"key": key, "substation": str(ss), "feeder": str(feeder), "nocs": str(nocs)})
+                changed = True
+            elif self.registry[i]["nocs"] != str(nocs):
+                self.registry[i]["nocs"] = str(nocs)
+                changed = True
+            ids[row] = i
+        if changed:
+            self._save_registry()
+        return ids
+
+    # ---- month files ----
+    def months(self):
+        return sorted(f[:-4] for f in os.listdir(os.path.join(self.path, "months")) if f.endswith(".npz"))
+
+    def _month_file(self, month):
+        return os.path.join(self.path, "months", f"{month}.npz")
+
+    def read_month(self, month):
+        with np.load(self._month_file(month)) as npz:
+            return {name: npz[name] for name in npz.files}
+
+    def _write_month(self, month, arrays):
+        _atomic_write(self._month_file(month), lambda fh: np.savez(fh, **arrays))
+
+    # ---- rollups ----
+    def _rollup_file(self, month):
+        return os.path.join(self.path, "rollups", f"{month}.json")
+
+    def read_rollup(self, month):
+        with open(self._rollup_file(month), encoding="utf-8") as fh:
+            return json.load(fh)
+
+    def _write_rollup(self, month, nocs_totals, registry):
+        totals = registry.rollup(list(nocs_totals), list(nocs_totals.values()))
+        data = json.dumps({
+            "nocs": nocs_totals,
+            "circle": totals.circle.to_dict(),
+            "zone": totals.zone.to_dict(),
+            "total": float(sum(nocs_totals.values())),
+        }, ensure_ascii=False).encode("utf-8")
+        _atomic_write(self._rollup_file(month), lambda fh: fh.write(data))
+
+    def _nocs_of(self, ids):
+        return np.array([self.registry[i]["nocs"] for i in ids], dtype=object)
+
+    def _fresh_rollup(self, month, ids, corrected, registry):
+        values = np.where(np.isnan(corrected), 0.0, corrected)
+        totals = pd.Series(values).groupby(self._nocs_of(ids)).sum()
+        self._write_rollup(month, {str(k): float(v) for k, v in totals.items()}, registry)
+
+    def _patch_rollup(self, month, ids, delta, registry):
+        # Only the NOCS touched by the changed feeders move; Circle and Zone are re-derived
+        # from the (fixed-size) NOCS totals.
+        nocs_totals = self.read_rollup(month)["nocs"]
+        for nocs, d in pd.Series(delta).groupby(self._nocs_of(ids)).sum().items():
+            nocs_totals[str(nocs)] = nocs_totals.get(str(nocs), 0.0) + float(d)
+        self._write_rollup(month, nocs_totals, registry)
+
+    # ---- deltas ----
+    def _log_deltas(self, records):
+        if not records:
+            return
+        with open(os.path.join(self.path, "deltas.jsonl"), "a", encoding="utf-8") as fh:
+            for rec in records:
+                fh.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+    def deltas(self):
+        path = os.path.join(self.path, "deltas.jsonl")
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=["month", "feeder", "field", "old", "new", "source", "at"])
+        return pd.read_json(path, lines=True)
+
+    def _merge(self, month, ids, fields, source, stamp, registry):
+        """Apply ``fields`` for feeders ``ids`` to an existing month; return delta records."""
+        stored = self.read_month(month)
+        pos = {int(i): p for p, i in enumerate(stored["feeder_id"])}
+        new_ids = [i for i in ids if int(i) not in pos]
+        if new_ids:
+            # Feeders commissioned since the month was written: extend with empty figures.
+            start = len(stored["feeder_id"])
+            stored["feeder_id"] = np.concatenate([stored["feeder_id"], np.asarray(new_ids, dtype=np.int32)])
+            for name in stored:
+                if name != "feeder_id":
+                    stored[name] = np.concatenate([stored[name], np.full(len(new_ids), np.nan)])
+            pos.update({int(i): start + k for k, i in enumerate(new_ids)})
+        rows = np.array([pos[int(i)] for i in ids], dtype=np.intp)
+
+        records, corrected_delta = [], None
+        for name, values in fields.items():
+            if name not in stored:
+                stored[name] = np.full(len(stored["feeder_id"]), np.nan)
+            old = stored[name][rows]
+            changed = ~_same(old, values)
+            if not changed.any():
+                continue
+            for i, o, n in zip(ids[changed], old[changed], values[changed]):
+                records.append({
+                    "month": month, "feeder": self.registry[i]["key"], "field": name,
+                    "old": None if np.isnan(o) else float(o), "new": None if np.isnan(n) else float(n),
+                    "source": source, "at": stamp,
+                })
+            if name == "corrected":
+                corrected_delta = (ids[changed], np.nan_to_num(values[changed]) - np.nan_to_num(old[changed]))
+            stored[name][rows] = values
+        if records:
+            self._write_month(month, stored)
+            if corrected_delta is not None:
+                self._patch_rollup(month, *corrected_delta, registry)
+        return records
+
+    def ingest(self, data, source=""):
+        """Fold one monthly workbook's ``FeederData`` into the history; return a short summary.
+
+        ``source`` (e.g. the workbook's digest) is recorded with every delta.
+        """
+        stamp = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        ids = self.feeder_ids(data)
+        history = month_columns(data.df.columns)
+        current = str((max(history.values()) + 1) if history else pd.Period.now("M"))
+        fields = {name: data.df[col].to_numpy(dtype=np.float64) for name, col in CURRENT_FIELDS.items()}
+
+        on_disk = set(self.months())
+        records, appended = [], []
+        if current in on_disk:
+            # Restated figures for a month we already hold are corrections.
+            records = self._merge(current, ids, fields, source, stamp, data.registry)
+        else:
+            self._write_month(current, {"feeder_id": ids, **fields})
+            self._fresh_rollup(current, ids, fields["corrected"], data.registry)
+            appended.append(current)
+        for col, period in history.items():
+            if str(period) not in on_disk:
+                corrected = data.df[col].to_numpy(dtype=np.float64)
+                self._write_month(str(period), {"feeder_id": ids, "corrected": corrected})
+                self._fresh_rollup(str(period), ids, corrected, data.registry)
+                appended.append(str(period))
+        self._log_deltas(records)
+        return {"month": current, "appended": sorted(appended), "feeders": len(ids), "deltas": len(records)}
+
+    def extend(self, store, keys):
+        """``store`` with the stored months it lacks, for the feeders ``keys`` (``Registry.feeder_keys``).
+
+        Months ``store`` has are kept as they are; feeders the history does
+        not know are NaN in the added months.
+        """
+        have = {str(p) for p in store.months}
+        extra = [month for month in self.months() if month not in have]
+        if not extra:
+            return store
+        ids = np.array([self._ids.get(key, -1) for key in keys], dtype=np.intp)
+        known = ids >= 0
+        values = np.full((len(ids), len(extra)), np.nan)
+        for j, month in enumerate(extra):
+            stored = self.read_month(month)
+            by_id = np.full(len(self.registry), np.nan)
+            by_id[stored["feeder_id"]] = stored["corrected"]
+            values[known, j] = by_id[ids[known]]
+        months = pd.PeriodIndex(list(store.months) + [pd.Period(m, freq="M") for m in extra])
+        order = months.argsort()
+        return MonthlyStore(np.hstack([store.values, values])[:, order], months[order], store.substation_codes,
+                            store.substations, store.nocs_codes, store.nocs)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fold monthly EB workbooks into the history store.")
+    parser.add_argument("workbooks", nargs="+")
+    parser.add_argument("--history", default=HISTORY_DIR)
+    args = parser.parse_args()
+
+    from engine import FeederData
+
+    store = History(args.history)
+    for path in args.workbooks:
+        print(path, store.ingest(FeederData.from_workbook(path), source=file_digest(path)[:16]))
@@ -0,0 +1,211 @@
+"""Named timing spans around the dashboard's pipeline stages.
+
+``span("stage")`` times the block it wraps and files the time under the
+current rerun. With ``EB_PROFILE`` unset (the default) ``span`` returns one
+shared no-op context manager, so an instrumented stage costs a global
+lookup and an empty ``with``.
+
+With ``EB_PROFILE=1`` every rerun records its spans (``begin_run`` /
+``end_run``, one run per script thread), and the process keeps:
+
+* the last ``RECENT_RUNS`` runs with their spans,
+* per stage: count, total, max and a latency histogram,
+* gauges registered with ``gauge`` (cache hit rates, cache sizes) and the
+  process memory.
+
+``report()`` is all of that as a dict (the dashboard's admin panel and its
+JSON download), ``prometheus()`` the same in the Prometheus text format,
+and with ``EB_METRICS_FILE`` set every finished run rewrites that file
+atomically for the node_exporter textfile collector.
+"""
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None
+
+ENABLED = os.environ.get("EB_PROFILE", "").lower() not in ("", "0", "false", "no")
+METRICS_FILE = os.environ.get("EB_METRICS_FILE")
+
+RECENT_RUNS = 50
+# Upper bounds (seconds) of the stage latency histogram
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NULL = nullcontext()
+
+
+class _Stage:
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        i = 0
+        while i < len(BUCKETS) and seconds > BUCKETS[i]:
+            i += 1
+        self.buckets[i] += 1
+
+
+class _Span:
+    __slots__ = ("recorder", "name", "start")
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.recorder.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Recorder:
+    """Spans of the running reruns and the aggregates of the finished ones."""
+
+    def __init__(self, recent=RECENT_RUNS):
+        self.runs = deque(maxlen=recent)
+        self.stages = {}
+        self.gauges = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def begin_run(self, name="rerun"):
+        self._local.run = {"name": name, "started": time.time(), "t0": time.perf_counter(), "spans": []}
+
+    def add(self, name, seconds):
+        run = getattr(self._local, "run", None)
+        if run is not None:
+            run["spans"].append((name, seconds))
+        with self._lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                stage = self.stages[name] = _Stage()
+            stage.add(seconds)
+
+    def end_run(self):
+        """Close the current thread's run; returns it (``None`` if none was open)."""
+        run = getattr(self._local, "run", None)
+        if run is None:
+            return None
+        self._local.run = None
+        run["seconds"] = time.perf_counter() - run.pop("t0")
+        self.add("run", run["seconds"])
+        with self._lock:
+            self.runs.append(run)
+        if METRICS_FILE:
+            write_textfile(METRICS_FILE, self)
+        return run
+
+    def gauge(self, name, read):
+        """Report ``read()`` (a number, or a ``{label: number}`` dict) as gauge ``name``."""
+        self.gauges[name] = read
+
+    def report(self):
+        with self._lock:
+            stages = {name: {"count": s.count, "total_s": s.total, "mean_s": s.total / s.count, "max_s": s.max}
+                      for name, s in self.stages.items()}
+            runs = list(self.runs)
+        return {
+            "stages": stages,
+            "last_run": runs[-1] if runs else None,
+            "recent_runs": [{"name": r["name"], "started": r["started"], "seconds": r["seconds"]} for r in runs],
+            "gauges": {name: _read(read) for name, read in self.gauges.items()},
+            "memory": memory(),
+        }
+
+    def prometheus(self):
+        """The aggregates in the Prometheus text exposition format."""
+        lines = ["# HELP eb_stage_seconds Time spent in each dashboard stage.",
+                 "# TYPE eb_stage_seconds histogram"]
+        with self._lock:
+            stages = [(name, s.count, s.total, list(s.buckets)) for name, s in sorted(self.stages.items())]
+        for name, count, total, buckets in stages:
+            cumulative = 0
+            for bound, n in zip(BUCKETS + ("+Inf",), buckets):
+                cumulative += n
+                lines.append(f'eb_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'eb_stage_seconds_sum{{stage="{name}"}} {total:.6f}')
+            lines.append(f'eb_stage_seconds_count{{stage="{name}"}} {count}')
+        for name, value in sorted(self.report()["gauges"].items()):
+            lines.append(f"# TYPE eb_{name} gauge")
+            values = value.items() if isinstance(value, dict) else [(None, value)]
+            for label, v in values:
+                if v is None:
+                    continue
+                labels = f'{{kind="{label}"}}' if label is not None else ""
+                lines.append(f"eb_{name}{labels} {v}")
+        lines.append("# TYPE eb_memory_bytes gauge")
+        for kind, v in memory().items():
+            lines.append(f'eb_memory_bytes{{kind="{kind}"}} {v}')
+        return "\n".join(lines) + "\n"
+
+
+def _read(read):
+    try:
+        return read()
+    except Exception:  # a broken gauge must not break the page
+        return None
+
+
+def memory():
+    """Resident and peak resident set size of the process, in bytes."""
+    found = {}
+    if resource is not None:
+        found["peak_rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    try:
+        with open("/proc/self/statm") as fh:
+            found["rss"] = int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    return found
+
+
+def write_textfile(path, recorder):
+    """Write ``recorder.prometheus()`` to ``path`` atomically."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    with os.fdopen(fd, "w", encoding="utf-8") as fh:
+        fh.write(recorder.prometheus())
+    os.replace(tmp, path)
+
+
+_recorder = Recorder()
+
+
+def recorder():
+    """The process-wide ``Recorder`` shared by all sessions."""
+    return _recorder
+
+
+def span(name):
+    """Time the ``with`` block as stage ``name`` (a shared no-op unless ``EB_PROFILE`` is set)."""
+    if not ENABLED:
+        return _NULL
+    return _Span(_recorder, name)
+
+
+def begin_run(name="rerun"):
+    """Start recording the spans of this thread's rerun (no-op unless ``EB_PROFILE`` is set)."""
+    if ENABLED:
+        _recorder.begin_run(name)
+
+
+def end_run():
+    """Finish this thread's rerun; returns it, or ``None`` when profiling is off."""
+    return _recorder.end_run() if ENABLED else None
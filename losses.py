@@ -0,0 +1,221 @@
+"""Technical loss of every substation, NOCS, Circle and Zone.
+
+The "%Loss " sheet of the monthly workbook records, per substation and
+month, the share of the 33 KV import that does not arrive at the 11 KV
+feeders, and may record the metered 33 KV import (kWh) beside it. The
+feeder table holds the other side: what every feeder sold. ``LossModel``
+joins the two once per load into substations x months matrices aligned
+with ``timeseries.MonthlyStore``. A substation's metered import is spread
+over its feeders in proportion to their sales; a month the sheet only has
+as a percentage falls back to the import that percentage implies,
+``sales / (1 - ratio)``. The import, sales and loss of every substation,
+NOCS, Circle and Zone of a month (and of the month before, for the
+comparison) then come out of one grouped sum per level.
+
+Substations with neither figure in the sheet (switching stations, names
+the sheet spells differently) are left out of both ``Import`` and
+``Sales``; ``Coverage`` is the share of a group's feeder sales that is
+accounted for.
+"""
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from hierarchy import canonical
+from snapshot import load_sheet
+from timeseries import month_label
+
+# Where the loss history lives: names in column C, page numbers in D, one
+# "<Month>-<YYYY>\n% of Loss" column per month from E, newest first, and an
+# optional "<Month>-<YYYY>\nImport" column (kWh) per month. No row count:
+# the table runs from the first header to the first row without a name
+# after the last one (a total, a note).
+LOSS_SHEET = dict(sheet_name="%Loss ", usecols="C:BZ")
+NAME_HEADER = "Name of S/S"
+
+# Level -> name column of its frame
+LEVELS = {"substation": "Substation_Name", "nocs": "NOCS", "circle": "Circle", "zone": "Zone"}
+Losses = namedtuple("Losses", list(LEVELS))
+# Substations x months: the sheet's loss % and metered import (NaN where it has none)
+LossHistory = namedtuple("LossHistory", ["loss", "imported"])
+
+_MONTH_HEADER = re.compile(r"^\s*([A-Za-z]+)-+(\d{4})")
+
+
+def _loose_key(name):
+    # Without the voltage levels; only trusted where it is unique on both sides.
+    return re.sub(r"\d+", "", canonical(name))
+
+
+def match_names(names, targets):
+    """Position in ``names`` of every target (-1 if none).
+
+    Keys are compared exactly first. A target left over is matched on its
+    key without voltage levels if exactly one name and one target share it.
+    """
+    exact = {}
+    for i, name in enumerate(names):
+        exact.setdefault(canonical(name), i)
+    loose_names = pd.Series([_loose_key(n) for n in names], dtype=object)
+    loose_targets = pd.Series([_loose_key(t) for t in targets], dtype=object)
+    unique_names = loose_names[~loose_names.duplicated(keep=False)]
+    loose = dict(zip(unique_names, unique_names.index))
+    unique_targets = set(loose_targets[~loose_targets.duplicated(keep=False)])
+    found = np.full(len(targets), -1, dtype=np.int64)
+    for j, target in enumerate(targets):
+        i = exact.get(canonical(target), -1)
+        if i < 0 and loose_targets[j] in unique_targets:
+            i = loose.get(loose_targets[j], -1)
+        found[j] = i
+    return found
+
+
+def _month(header):
+    m = _MONTH_HEADER.match(str(header))
+    if not m:
+        return None
+    try:
+        return month_label(pd.Period(f"{m.group(1)} {m.group(2)}", freq="M"))
+    except ValueError:
+        return None
+
+
+def read_loss_history(workbook):
+    """``parse_loss_sheet`` of the workbook's "%Loss " sheet, through the columnar snapshot."""
+    return parse_loss_sheet(load_sheet(workbook, **LOSS_SHEET))
+
+
+def parse_loss_sheet(raw):
+    """``LossHistory`` of the sheet: substations (index, named as in the sheet) x months (columns).
+
+    ``raw`` is the sheet as read with ``LOSS_SHEET``. The sheet lists the
+    NORTH and SOUTH substations in two blocks, each under its own header
+    row. Error cells (``#REF!``, ``#DIV/0!``) are NaN.
+    """
+    names = raw.iloc[:, 0].to_numpy(dtype=object)
+    is_text = np.array([isinstance(v, str) and bool(v.strip()) for v in names], dtype=bool)
+    headers = np.flatnonzero(is_text & (np.char.strip(names.astype(str)) == NAME_HEADER))
+    if not len(headers):
+        raise ValueError(f"no {NAME_HEADER!r} header in sheet {LOSS_SHEET['sheet_name']!r}")
+    # The summary above the table and what follows it are not substations
+    gaps = np.flatnonzero(~is_text[headers[-1] + 1:])
+    end = headers[-1] + 1 + gaps[0] if len(gaps) else len(raw)
+    raw, names, is_text = raw.iloc[:end], names[:end], is_text[:end]
+    header = raw.iloc[headers[0], 2:]
+    months = [_month(h) for h in header]
+    imports = ["import" in str(h).lower() for h in header]
+    values = raw.iloc[:, 2:].apply(pd.to_numeric, errors="coerce")
+    rows = is_text & values.iloc[:, [i for i, m in enumerate(months) if m]].notna().any(axis=1).to_numpy()
+    rows[:headers[0]] = False
+    rows[headers] = False
+    index = pd.Index([" ".join(n.split()) for n in names[rows]], name="Substation_Name")
+    keep = ~index.duplicated()
+
+    def table(is_import):
+        columns = [i for i, m in enumerate(months) if m and imports[i] == is_import]
+        found = values.iloc[rows, columns]
+        found.index = index
+        found.columns = [months[i] for i in columns]
+        return found.loc[keep, ~found.columns.duplicated()]
+
+    labels = list(dict.fromkeys(m for m in months if m))
+    return LossHistory(table(False).reindex(columns=labels), table(True).reindex(columns=labels))
+
+
+def _frame(name, labels, sums):
+    # sums: groups x [sales, covered sales, import] for the month, then for the month before
+    sales, covered, imported, _, prev_covered, prev_imported = sums.T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        loss = np.where(imported > 0, (imported - covered) / imported * 100, np.nan)
+        previous = np.where(prev_imported > 0, (prev_imported - prev_covered) / prev_imported * 100, np.nan)
+        coverage = np.where(sales != 0, covered / sales * 100, np.nan)
+    frame = pd.DataFrame({
+        name: np.asarray(labels, dtype=object),
+        "Sales": covered.round(),
+        "Import": imported.round(),
+        "Loss_kWh": (imported - covered).round(),
+        "Loss": loss,
+        "Previous_Loss": previous,
+        "Loss_Change": loss - previous,
+        "Coverage": coverage,
+    })
+    frame.insert(1, "Rank", frame["Loss"].rank(ascending=False, method="min").astype("Int64"))
+    return frame
+
+
+class LossModel:
+    """Loss ratios and metered imports of the feeder table's substations for every month of its store."""
+
+    def __init__(self, data, history):
+        store = data.monthly
+        self.data = data
+        self.history = history
+        names = history.loss.index
+        rows = match_names(list(names), list(store.substations))
+        cols = history.loss.columns.get_indexer([month_label(p) for p in store.months])
+
+        def aligned(frame, unit):
+            # Substations x store months; one extra NaN row and column so -1 (no substation, no month) maps to NaN
+            table = np.vstack([frame.to_numpy(dtype=np.float64) / unit, np.full(frame.shape[1], np.nan)])
+            table = np.column_stack([table, np.full(len(table), np.nan)])
+            found = table[np.append(rows, -1)][:, cols]
+            found.flags.writeable = False
+            return found
+
+        self.ratio = aligned(history.loss, 100)
+        self.imported = aligned(history.imported, 1)
+        self.matched = pd.Series(np.asarray(names, dtype=object)[rows[rows >= 0]],
+                                 index=store.substations[rows >= 0], name="Loss_Sheet_Name")
+        df = data.df
+        self._codes = {
+            "substation": (store.substation_codes, store.substations),
+            "nocs": (df["NOCS"].cat.codes.to_numpy(), df["NOCS"].cat.categories),
+            "circle": (df["Circle"].cat.codes.to_numpy(), df["Circle"].cat.categories),
+            "zone": (df["Zone"].cat.codes.to_numpy(), df["Zone"].cat.categories),
+        }
+
+    @property
+    def unmatched(self):
+        """Substations of the feeder table with no row in the loss sheet."""
+        return [s for s in self.data.monthly.substations if s not in self.matched.index]
+
+    def _quantities(self, position):
+        """Feeders x [sales, covered sales, import] of one store month (zeros before the first).
+
+        A substation's metered import goes to its feeders in proportion to
+        their sales; without one, the import implied by its loss %.
+        """
+        store = self.data.monthly
+        if position < 0:
+            return np.zeros((len(store.values), 3))
+        codes = store.substation_codes
+        sales = np.nan_to_num(store.values[:, position])
+        known = codes >= 0
+        substation_sales = np.append(np.bincount(codes[known], sales[known], minlength=len(self.imported) - 1), 0.0)
+        metered = self.imported[codes, position]
+        total = substation_sales[codes]
+        ratio = self.ratio[codes, position]
+        with np.errstate(invalid="ignore"):
+            has_import = ~np.isnan(metered) & (total > 0)
+            implied = ~has_import & ~np.isnan(ratio) & (ratio < 1)
+        imported = np.zeros_like(sales)
+        imported[has_import] = metered[has_import] * sales[has_import] / total[has_import]
+        imported[implied] = sales[implied] / (1 - ratio[implied])
+        covered = has_import | implied
+        return np.column_stack([sales, np.where(covered, sales, 0.0), imported])
+
+    def month(self, month):
+        """``Losses`` of every level for ``month``, each ranked by loss and compared with the month before."""
+        position = self.data.monthly.position(month)
+        quantities = np.hstack([self._quantities(position), self._quantities(position - 1)])
+        frames = {}
+        for level, (codes, labels) in self._codes.items():
+            known = codes >= 0
+            sums = np.zeros((len(labels), quantities.shape[1]))
+            np.add.at(sums, codes[known], quantities[known])
+            present = np.bincount(codes[known], minlength=len(labels)) > 0
+            frames[level] = _frame(LEVELS[level], np.asarray(labels)[present], sums[present])
+        return Losses(**frames)
+
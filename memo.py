@@ -0,0 +1,115 @@
+"""Process-wide memo for derived frames, HTML and Plotly figures.
+
+Everything the dashboard draws is a pure function of the data snapshot and
+a few widget values (month, substation, ...). ``Memo`` keeps those results
+across reruns and sessions under ``(version, key)``, where ``version``
+identifies the data snapshot. When a newer snapshot is loaded, the first
+lookup with the new version drops every entry of the old one. A session
+still on a replaced version gets its values built but not kept, and does
+not clear the memo again. The total size of the entries is bounded and
+least recently used entries go first.
+
+Plotly figures are kept as their JSON, which skips both the Plotly Express
+build (the path hierarchy of a treemap takes ~250 ms) and the
+serialisation; a rerun sends the string as it is.
+"""
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+MEMO_BYTES = 128 * 1024 * 1024
+
+
+def sizeof(value):
+    """Approximate memory held by a memoized value."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+
+class Memo:
+    def __init__(self, max_bytes=MEMO_BYTES):
+        self.max_bytes = max_bytes
+        self.version = None
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._retired = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def _switch(self, version):
+        # Only forward: a version is never current again once it has been replaced
+        if version != self.version and version not in self._retired:
+            if self.version is not None:
+                self._retired.add(self.version)
+            self._items.clear()
+            self.size = 0
+            self.version = version
+
+    def get(self, version, key, build):
+        """Value of ``key`` for snapshot ``version``, calling ``build()`` on a miss."""
+        with self._lock:
+            self._switch(version)
+            entry = self._items.get(key) if version == self.version else None
+            if entry is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        value = build()
+        size = sizeof(value)
+        with self._lock:
+            # A concurrent rerun may already have moved on to a newer snapshot.
+            if version == self.version and size <= self.max_bytes:
+                old = self._items.pop(key, None)
+                if old is not None:
+                    self.size -= old[1]
+                self._items[key] = (value, size)
+                self.size += size
+                self._evict()
+        return value
+
+    def _evict(self):
+        while self.size > self.max_bytes and self._items:
+            _, (_, evicted) = self._items.popitem(last=False)
+            self.size -= evicted
+
+    def resize(self, version, key):
+        """Measure the value of ``key`` again, for values that grow after they are built (``Grid``)."""
+        with self._lock:
+            entry = self._items.get(key) if version == self.version else None
+            if entry is None:
+                return
+            size = sizeof(entry[0])
+            self._items[key] = (entry[0], size)
+            self.size += size - entry[1]
+            self._evict()
+
+    def invalidate(self, version=None):
+        """Drop every entry; later lookups must use ``version``."""
+        with self._lock:
+            if self.version not in (None, version):
+                self._retired.add(self.version)
+            self._items.clear()
+            self.size = 0
+            self.version = version
+
+
+_memo = Memo()
+
+
+def memo():
+    """The process-wide ``Memo`` shared by all sessions."""
+    return _memo
@@ -0,0 +1,73 @@
+"""Per-key row partitions of the feeder table for constant-time drill-downs."""
+import numpy as np
+import pandas as pd
+
+
+class PartitionIndex:
+    """Rows of ``df`` grouped by ``key``, built once per data load.
+
+    ``order`` lists the row positions key by key. A key whose rows already
+    sit together in ``df`` (every substation of ``engine.feeder_rows``) is
+    served as a positional slice of ``df``, a view with no scan and no copy;
+    the rows of any other key are gathered from its positions, copying only
+    that key's rows. Column totals per key are precomputed, so a drill-down
+    never has to touch the rest of the table.
+    """
+
+    def __init__(self, df, key, totals=("Consumption", "Corrected_Consumption")):
+        codes, uniques = pd.factorize(df[key])
+        keep = codes >= 0
+        order = np.flatnonzero(keep)[np.argsort(codes[keep], kind="stable")]
+        counts = np.bincount(codes[keep], minlength=len(uniques))
+
+        self.key = key
+        self.frame = df
+        self.order = order
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+        # Positions within a key ascend, so its rows are contiguous when they span exactly their count
+        self.contiguous = order[self.offsets[1:] - 1] - order[self.offsets[:-1]] + 1 == counts
+        self._slot = {k: i for i, k in enumerate(uniques)}
+        self.totals = {}
+        for col in totals:
+            values = df[col].to_numpy(dtype=np.float64)
+            values = np.where(np.isnan(values), 0.0, values)
+            self.totals[col] = np.bincount(codes[keep], weights=values[keep], minlength=len(uniques))
+
+    def __contains__(self, k):
+        return k in self._slot
+
+    def keys(self):
+        return list(self._slot)
+
+    def bounds(self, k):
+        """``(start, stop)`` of ``k``'s block in ``order``; ``(0, 0)`` if absent."""
+        i = self._slot.get(k)
+        if i is None:
+            return 0, 0
+        return int(self.offsets[i]), int(self.offsets[i + 1])
+
+    def positions(self, k):
+        """Row positions of ``k`` in the original frame, in block order."""
+        start, stop = self.bounds(k)
+        return self.order[start:stop]
+
+    def rows(self, k, columns=None):
+        i = self._slot.get(k)
+        if i is None:
+            block = self.frame.iloc[:0]
+        elif self.contiguous[i]:
+            start = int(self.order[self.offsets[i]])
+            block = self.frame.iloc[start:start + int(self.offsets[i + 1] - self.offsets[i])]
+        else:
+            block = self.frame.take(self.positions(k))
+        return block if columns is None else block[columns]
+
+    def total(self, k, column):
+        i = self._slot.get(k)
+        return 0.0 if i is None else float(self.totals[column][i])
+
+    def sums(self, values):
+        """Per-key totals of ``values`` (aligned with the original frame), in ``keys()`` order."""
+        values = np.asarray(values, dtype=np.float64)[self.order]
+        cum = np.concatenate(([0.0], np.cumsum(np.where(np.isnan(values), 0.0, values))))
+        return cum[self.offsets[1:]] - cum[self.offsets[:-1]]
@@ -0,0 +1,147 @@
+"""Bulk table rendering for FPDF 1.7.2.
+
+``FPDF.cell`` formats one cell at a time and appends it to the page with
+``pages[n] += s``, which re-copies the whole page string on every call, so
+a report of a few thousand feeder rows takes seconds. ``write_table``
+produces the same bordered, centred grid but:
+
+* formats and escapes every column once, not cell by cell;
+* measures centred text with a per-character width lookup in NumPy;
+* draws the borders of a page as one grid of lines instead of a rectangle
+  per cell;
+* emits each page's content stream in a single ``_out`` call, adding pages
+  and repeating the header row automatically.
+
+Only the 14 core fonts are handled here. TTF (unicode) fonts fall back to
+``FPDF.cell``.
+"""
+import numpy as np
+
+
+def format_columns(df):
+    """Cell text per column, as ``str(value)`` would render it."""
+    # NumPy's object -> str cast calls str() per value, so NaN becomes "nan" as before.
+    return [df[col].to_numpy(dtype=object).astype(str).tolist() for col in df.columns]
+
+
+def _escape(texts):
+    # Same escaping as FPDF._escape, applied to a whole column at once: the
+    # column is joined into one string, replaced, and split back.
+    joined = "\0".join(texts)
+    for old, new in (("\\", "\\\\"), (")", "\\)"), ("(", "\\("), ("\r", "\\r")):
+        joined = joined.replace(old, new)
+    return joined.split("\0")
+
+
+def _text_widths(pdf, texts):
+    """Width in user units of every string in ``texts`` in the current font."""
+    cw = pdf.current_font["cw"]
+    table = np.zeros(257)
+    for ch, w in cw.items():
+        if len(ch) == 1 and ord(ch) < 256:
+            table[ord(ch)] = w
+    arr = np.asarray(texts, dtype=str)
+    if len(arr) == 0 or arr.dtype.itemsize == 0:
+        return np.zeros(len(arr))
+    codes = arr.view(np.uint32).reshape(len(arr), -1)
+    codes = np.where(codes == 0, 256, np.minimum(codes, 255))
+    return table[codes].sum(axis=1) * pdf.font_size / 1000.0
+
+
+def _cell_ops(pdf, texts, x_left, cell_width):
+    """Per-cell ``BT .. Tj ET`` fragments (still missing the y coordinate)."""
+    k = pdf.k
+    xs = (x_left + (cell_width - _text_widths(pdf, texts)) / 2.0) * k
+    escaped = _escape(texts)
+    return [
+        None if t == "" else ("BT %.2f " % x, " Td (%s) Tj ET" % e)
+        for t, e, x in zip(texts, escaped, xs)
+    ]
+
+
+def _grid(pdf, x0, y0, widths, n_rows, height):
+    k, H = pdf.k, pdf.h
+    x1 = x0 + sum(widths)
+    ops = []
+    for i in range(n_rows + 1):
+        y = (H - (y0 + i * height)) * k
+        ops.append("%.2f %.2f m %.2f %.2f l S" % (x0 * k, y, x1 * k, y))
+    x = x0
+    for w in [0] + list(widths):
+        x += w
+        ops.append("%.2f %.2f m %.2f %.2f l S" % (x * k, (H - y0) * k, x * k, (H - (y0 + n_rows * height)) * k))
+    return ops
+
+
+def write_table(pdf, df, cell_width=35, cell_height=6,
+                header_font=("Arial", "B", 8), body_font=("Arial", "", 7)):
+    """Render ``df`` as a bordered table at the current position of ``pdf``.
+
+    Leaves ``pdf.x``/``pdf.y`` just below the last row, as a sequence of
+    ``pdf.cell(...)`` calls followed by ``pdf.ln`` would.
+    """
+    pdf.set_font(*body_font)
+    if pdf.unifontsubset:
+        return _write_table_cells(pdf, df, cell_width, cell_height, header_font, body_font)
+
+    ncols = len(df.columns)
+    widths = [cell_width] * ncols
+    x0 = pdf.l_margin
+    lefts = [x0 + j * cell_width for j in range(ncols)]
+
+    pdf.set_font(*header_font)
+    header_font_size = pdf.font_size
+    header_ops = _cell_ops(pdf, [str(c) for c in df.columns], np.array(lefts), cell_width)
+
+    pdf.set_font(*body_font)
+    body_font_size = pdf.font_size
+    columns = [_cell_ops(pdf, texts, left, cell_width) for texts, left in zip(format_columns(df), lefts)]
+    rows = list(zip(*columns)) if columns else []
+
+    k, H = pdf.k, pdf.h
+    wrap = pdf.color_flag
+
+    def text_ops(cells, y, font_size):
+        ty = "%.2f" % ((H - (y + 0.5 * cell_height + 0.3 * font_size)) * k)
+        out = [c[0] + ty + c[1] for c in cells if c is not None]
+        if wrap and out:
+            out = ["q " + pdf.text_color] + out + ["Q"]
+        return out
+
+    start = 0
+    first_page = True
+    while True:
+        if not first_page or pdf.y + 2 * cell_height > pdf.page_break_trigger:
+            pdf.add_page(pdf.cur_orientation)
+        first_page = False
+        y0 = pdf.y
+        fit = int((pdf.page_break_trigger - y0) // cell_height) - 1
+        stop = min(len(rows), start + max(fit, 1))
+
+        pdf.set_font(*header_font)
+        pdf._out("\n".join(text_ops(header_ops, y0, header_font_size)))
+        pdf.set_font(*body_font)
+        ops = _grid(pdf, x0, y0, widths, stop - start + 1, cell_height)
+        for i, cells in enumerate(rows[start:stop]):
+            ops.extend(text_ops(cells, y0 + (i + 1) * cell_height, body_font_size))
+        pdf._out("\n".join(ops))
+
+        pdf.y = y0 + (stop - start + 1) * cell_height
+        pdf.x = pdf.l_margin
+        pdf.lasth = cell_height
+        start = stop
+        if start >= len(rows):
+            break
+
+
+def _write_table_cells(pdf, df, cell_width, cell_height, header_font, body_font):
+    pdf.set_font(*header_font)
+    for col in df.columns:
+        pdf.cell(cell_width, cell_height, str(col), align="C", border=1)
+    pdf.ln(cell_height)
+    pdf.set_font(*body_font)
+    columns = format_columns(df)
+    for i in range(len(df)):
+        for texts in columns:
+            pdf.cell(cell_width, cell_height, texts[i], align="C", border=1)
+        pdf.ln(cell_height)
@@ -0,0 +1,269 @@
+"""Meter readings of the zone sheets and the PDB bill, from many workbooks at once.
+
+``Linked_11KV`` only carries the result per feeder. The readings behind it
+are on the zone sheets (NORTH-1, NORTH-2, SOUTH-1, SOUTH-2: one block per
+substation and voltage level, each under a "<kV> KV SIDE of___<S/S>"
+title) and on ``PDB Bill AMR`` (the grid meters of the bulk supply, under
+"<kV> KV LEVEL" and substation titles). ``load_readings`` decodes every
+(workbook, sheet) pair in a process pool and stacks them into one table
+with one row per meter reading:
+
+    Workbook, Month, Sheet, Row       where the reading comes from
+    Substation, Level, Section        the block it is in (Level in kV)
+    Feeder_Name, Feeder_No, Feeder_Code, Meter_No, Voltage, Direction
+    CF, OMF, Opening_Reading, Closing_Reading, Difference
+    Import_kWh, Export_kWh, Corrected_kWh, NOCS, Remarks
+
+Columns a sheet does not have are missing (``PDB Bill AMR`` has no NOCS or
+corrected figures). Totals, headings and the summary boxes are left out.
+
+The text columns are categoricals over one shared string dictionary: each
+distinct string of all workbooks and sheets is stored once and every text
+column holds ``int32`` codes into it, so a year of workbooks costs little
+more than its numbers. Group text columns with ``observed=True``.
+
+"ALL SS Loss History" holds loss results per substation rather than
+readings; the loss figures come from "%Loss " (``losses``).
+
+Usage: ``python readings.py EB.xlsx|DIR ... [--sheets NORTH-1 ...] [--jobs 4] [-o readings.parquet]``
+"""
+import os
+import re
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from xlsx_reader import read_rows, workbooks
+
+ZONE_SHEETS = ("NORTH-1", "NORTH-2", "SOUTH-1", "SOUTH-2")
+AMR_SHEET = "PDB Bill AMR"
+SHEETS = ZONE_SHEETS + (AMR_SHEET,)
+
+TEXT = ["Workbook", "Month", "Sheet", "Substation", "Section", "Feeder_Name", "Feeder_No", "Feeder_Code",
+        "Meter_No", "Direction", "NOCS", "Remarks"]
+COLUMNS = ["Workbook", "Month", "Sheet", "Row", "Substation", "Level", "Section", "Feeder_Name", "Feeder_No",
+           "Feeder_Code", "Meter_No", "Voltage", "Direction", "CF", "OMF", "Opening_Reading", "Closing_Reading",
+           "Difference", "Import_kWh", "Export_kWh", "Corrected_kWh", "NOCS", "Remarks"]
+
+# Zone sheets, columns A:Q (0-based); A holds the block titles, B the names
+ZONE_COLUMNS = {2: "Feeder_No", 3: "Feeder_Code", 4: "Voltage", 6: "Meter_No", 7: "CF",
+                8: "Opening_Reading", 9: "Closing_Reading", 10: "Difference", 11: "OMF", 12: "Import_kWh",
+                13: "Export_kWh", 14: "Corrected_kWh", 15: "NOCS", 16: "Remarks"}
+# PDB Bill AMR, columns B:N; B holds the serial numbers and the titles, C the names, D the meter location
+AMR_COLUMNS = {4: "Voltage", 6: "Meter_No", 7: "CF", 8: "OMF",
+               9: "Opening_Reading", 10: "Closing_Reading", 11: "Difference", 12: "Import_kWh", 13: "Export_kWh"}
+
+_BLOCK = re.compile(r"^\s*(\d+)\s*KV SIDE of_*\s*(.+?)\s*$", re.I)
+_LEVEL = re.compile(r"^\s*(\d+)\s*KV LEVEL\s*$", re.I)
+_DIRECTION = re.compile(r"^\s*(net\s+)?(imp|exp)", re.I)
+_MONTH = re.compile(r"^\s*Month\s+([A-Za-z]+-\d{4})\s*$")
+# "HASNABAD 132/33 KV S/S \n(Tel: 03894...)": the phone numbers are not part of the name
+_PHONE = re.compile(r"\s*\(Tel.*$", re.S)
+
+Readings = namedtuple("Readings", "table skipped")
+
+
+def _text(value):
+    # Whitespace as in ingest.feeder_keys; meter numbers like 8993631 become text
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return " ".join(str(value).split()) or None
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _direction(value):
+    # "IMPORT", "Imp", "NET IMPORT" -> "Import", "Import", "Net import"; other notes in the column -> None
+    match = _DIRECTION.match(value) if isinstance(value, str) else None
+    if not match:
+        return None
+    direction = "Import" if match[2].lower() == "imp" else "Export"
+    return "Net " + direction.lower() if match[1] else direction
+
+
+def _month(value):
+    match = _MONTH.match(value) if isinstance(value, str) else None
+    return match[1] if match else None
+
+
+def zone_readings(rows):
+    """Reading records of a zone sheet's ``read_rows`` (columns A:Q)."""
+    records = []
+    month = substation = level = section = direction = None
+    for row_no, cells in rows:
+        title = cells.get(0)
+        block = _BLOCK.match(title) if isinstance(title, str) else None
+        if block:
+            level, substation = float(block[1]), block[2]
+            section = direction = None
+            month = _month(cells.get(16)) or month
+            continue
+        name, omf = cells.get(1), cells.get(11)
+        if title == "Sl. No." or not isinstance(name, str):
+            continue
+        if not _is_number(omf):
+            # "DHANMONDI 11 KV SIDE", "33/11 KV Transforfers": the next rows' section
+            section = name
+            direction = _direction(cells.get(5))
+            continue
+        # F names the direction on the first meter it applies to, but not in every block; the
+        # kWh column the figure is in (M import, N export) says it for every meter
+        direction = _direction(cells.get(5)) or direction
+        imported, exported = _is_number(cells.get(12)), _is_number(cells.get(13))
+        record = {"Row": row_no, "Month": month, "Substation": substation, "Level": level, "Section": section,
+                  "Feeder_Name": name,
+                  "Direction": direction if imported == exported else "Import" if imported else "Export"}
+        record.update((field, cells.get(col)) for col, field in ZONE_COLUMNS.items())
+        records.append(record)
+    return records
+
+
+def amr_readings(rows):
+    """Reading records of ``PDB Bill AMR``'s ``read_rows`` (columns B:N).
+
+    The import meter of a circuit sits on the row under its export meter,
+    usually without a name; it gets the circuit's name.
+    """
+    records = []
+    month = substation = level = name = None
+    for row_no, cells in rows:
+        month = month or _month(cells.get(12))
+        first, second = cells.get(1), cells.get(2)
+        heading = _LEVEL.match(first) if isinstance(first, str) else None
+        if heading:
+            level = float(heading[1])
+            continue
+        if isinstance(first, str) and second is None and not _is_number(cells.get(8)):
+            substation = _PHONE.sub("", first)
+            name = None
+            continue
+        direction = _direction(cells.get(5))
+        if not _is_number(cells.get(8)) or direction is None:
+            continue
+        if second is not None:
+            name = second
+        record = {"Row": row_no, "Month": month, "Substation": substation, "Level": level, "Feeder_Name": name,
+                  "Direction": direction}
+        record.update((field, cells.get(col)) for col, field in AMR_COLUMNS.items())
+        records.append(record)
+    return records
+
+
+PARSERS = {**{sheet: (zone_readings, "A:Q") for sheet in ZONE_SHEETS}, AMR_SHEET: (amr_readings, "B:N")}
+
+
+def sheet_readings(workbook, sheet):
+    """The readings of one sheet of ``workbook`` as a frame (text columns as plain objects)."""
+    if sheet not in PARSERS:
+        raise ValueError(f"no reader for sheet {sheet!r}")
+    parse, usecols = PARSERS[sheet]
+    records = parse(read_rows(workbook, sheet, usecols))
+    data = {}
+    for column in COLUMNS:
+        values = [r.get(column) for r in records]
+        if column in TEXT:
+            data[column] = np.array([_text(v) for v in values], dtype=object)
+        else:
+            data[column] = np.array([v if _is_number(v) else np.nan for v in values], dtype=np.float64)
+    data["Workbook"][:] = os.path.basename(workbook)
+    data["Sheet"][:] = sheet
+    return pd.DataFrame(data, columns=COLUMNS, copy=False)
+
+
+def _encoded(task):
+    # One (workbook, sheet) in a worker: text columns go back as codes + distinct values, which
+    # pickle much smaller than the strings
+    workbook, sheet = task
+    try:
+        frame = sheet_readings(workbook, sheet)
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile) as exc:
+        return (workbook, sheet), None, str(exc)
+    part = {}
+    for column in COLUMNS:
+        if column in TEXT:
+            codes, uniques = pd.factorize(frame[column].to_numpy())
+            part[column] = (codes.astype(np.int32), np.asarray(uniques, dtype=object))
+        else:
+            part[column] = frame[column].to_numpy()
+    return (workbook, sheet), part, None
+
+
+def merge(parts):
+    """One frame of ``_encoded`` parts, all text columns re-coded against one shared dictionary."""
+    parts = [p for p in parts if p]
+    local = [p[column][1] for p in parts for column in TEXT]
+    global_codes, strings = pd.factorize(np.concatenate(local) if local else np.empty(0, dtype=object))
+    dtype = pd.CategoricalDtype(pd.Index(strings, dtype=object))
+    # Where each part's distinct values start in ``global_codes``
+    starts = np.cumsum([0] + [len(u) for u in local])
+    data, k = {column: [np.empty(0, dtype=np.int32 if column in TEXT else np.float64)] for column in COLUMNS}, 0
+    for p in parts:
+        for column in COLUMNS:
+            if column in TEXT:
+                # A trailing -1 keeps missing cells (code -1) missing
+                mapping = np.append(global_codes[starts[k]:starts[k + 1]], -1).astype(np.int32)
+                data[column].append(mapping[p[column][0]])
+                k += 1
+            else:
+                data[column].append(p[column])
+    table = {}
+    for column in COLUMNS:
+        values = np.concatenate(data[column])
+        table[column] = pd.Categorical.from_codes(values, dtype=dtype) if column in TEXT else values
+    frame = pd.DataFrame(table, columns=COLUMNS, copy=False)
+    frame["Row"] = frame["Row"].astype(np.int32)
+    return frame
+
+
+def load_readings(paths, sheets=SHEETS, jobs=None):
+    """``Readings(table, skipped)`` of every sheet in ``sheets`` of every workbook of ``paths``.
+
+    Directories stand for the .xlsx files in them. The (workbook, sheet)
+    pairs are decoded in a process pool of ``jobs`` workers (default: one
+    per core; ``jobs=1`` decodes in this process). Rows keep the order of
+    ``paths`` and ``sheets``. A sheet that is missing or cannot be read is
+    listed in ``skipped`` as ``(workbook, sheet, reason)`` instead of
+    failing the load.
+    """
+    tasks = [(workbook, sheet) for workbook in workbooks(paths) for sheet in sheets]
+    if jobs == 1 or len(tasks) <= 1:
+        results = list(map(_encoded, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs or os.cpu_count(), len(tasks))) as pool:
+            results = list(pool.map(_encoded, tasks))
+    skipped = [(workbook, sheet, error) for (workbook, sheet), _, error in results if error is not None]
+    return Readings(merge(part for _, part, _ in results), skipped)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    import time
+
+    parser = argparse.ArgumentParser(description="Decode the meter readings of EB workbooks into one table.")
+    parser.add_argument("workbooks", nargs="*", default=["EB.xlsx"], help="workbooks or directories of workbooks")
+    parser.add_argument("--sheets", nargs="+", default=list(SHEETS), choices=SHEETS)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("-o", "--output", help="write the table to this .parquet or .csv file")
+    args = parser.parse_args()
+    t0 = time.perf_counter()
+    table, skipped = load_readings(args.workbooks, args.sheets, args.jobs)
+    seconds = time.perf_counter() - t0
+    for workbook, sheet, error in skipped:
+        print(f"{workbook} / {sheet}: skipped ({error})", file=sys.stderr)
+    if len(table):
+        print(table.groupby(["Workbook", "Sheet"], observed=True).size().unstack(fill_value=0).to_string())
+    print(f"{len(table)} readings, {len(table['Workbook'].cat.categories)} distinct strings, "
+          f"{table.memory_usage(deep=True).sum() / 2**20:.1f} MB, {seconds:.1f}s")
+    if args.output:
+        if args.output.endswith(".csv"):
+            table.to_csv(args.output, index=False)
+        else:
+            table.to_parquet(args.output, index=False)
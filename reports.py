@@ -0,0 +1,129 @@
+"""PDF reports and the cache that keeps them between reruns.
+
+A report is fully determined by its title, its type ("table" or "summary")
+and the rows it prints, so ``report_key`` hashes exactly those and
+``ReportCache`` stores the rendered PDF bytes under that key. The dashboard
+only renders a report when someone asks for it; asking again for the same
+month's summary, or for a substation somebody else already downloaded, is
+a dictionary lookup.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+from fpdf import FPDF
+
+from pdf_table import write_table
+
+# Upper bound on the rendered PDFs kept in memory by the process-wide cache.
+REPORT_CACHE_BYTES = 64 * 1024 * 1024
+
+
+def output_df_to_pdf(pdf, df):
+    # Bordered 35 x 6 mm cells: Arial bold 8 for the column names, Arial 7 for the rows.
+    # write_table emits a whole page per call and repeats the header on every page.
+    write_table(pdf, df, cell_width=35, cell_height=6,
+                header_font=('Arial', 'B', 8), body_font=('Arial', '', 7))
+    pdf.ln()
+    pdf.set_font('Arial', 'B', 10)
+    if "Consumption" in df:
+        pdf.cell(0, 10, txt="Total Consumption:- " + str(df["Consumption"].sum()))
+    pdf.ln()
+    pdf.cell(0, 10, txt="Total Corrected Consumption:- " + str(df["Corrected_Consumption"].sum()))
+
+
+def build_pdf(report_text, data, report_type):
+    """Render one report and return the PDF as bytes."""
+    if report_type == 'table':
+        pdf = FPDF('landscape', 'mm', "A4")
+    elif report_type == 'summary':
+        pdf = FPDF('Portrait', 'mm', "A4")
+    else:
+        raise ValueError(f"unknown report type {report_type!r}")
+    pdf.add_page()
+    pdf.set_font('Arial', 'B', 16)
+    if report_type == 'table':
+        pdf.cell(0, 10, txt=report_text, align="C")
+    else:
+        pdf.cell(0, 10, txt=report_text, align="L")
+    pdf.ln()
+    output_df_to_pdf(pdf, data)
+    return pdf.output(dest="S").encode("latin-1")
+
+
+def report_key(report_text, data, report_type):
+    """Content hash of a report: title, type, column names and cell values."""
+    h = hashlib.sha256()
+    h.update(repr((report_text, report_type, [str(c) for c in data.columns])).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+class ReportCache:
+    """Rendered reports by ``report_key``, least recently used evicted first.
+
+    The total size of the stored PDFs never exceeds ``max_bytes``; a single
+    report larger than that is returned but not kept. Safe to share between
+    the script threads of concurrent sessions.
+    """
+
+    def __init__(self, max_bytes=REPORT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return data
+
+    def put(self, key, data):
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            if len(data) > self.max_bytes:
+                return data
+            self._items[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+            return data
+
+    def get_or_build(self, report_text, data, report_type, key=None):
+        """Cached PDF for the report, rendering it on a miss."""
+        key = key or report_key(report_text, data, report_type)
+        pdf = self.get(key)
+        if pdf is None:
+            pdf = self.put(key, build_pdf(report_text, data, report_type))
+        return pdf
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+
+_cache = ReportCache()
+
+
+def report_cache():
+    """The process-wide ``ReportCache`` shared by all sessions."""
+    return _cache
@@ -0,0 +1,117 @@
+"""Typo-tolerant prefix and fuzzy search over feeder, substation and NOCS names.
+
+``SearchIndex`` is built once per data load. Every name is split into
+words, each word normalised with ``hierarchy.canonical`` and cut into
+trigrams (plus one anchored at the start of the word). A query is cut the
+same way; the posting lists of its trigrams are counted with one
+``np.bincount``, so the candidates and their overlap come out of a single
+array pass instead of a scan over the names. Query words that are a
+prefix of a name's words are found by bisecting the sorted word list and
+rank first, so "dhan bal" finds the Balaka feeder of Dhanmondi while it is
+being typed, and "balka" still finds it by trigram overlap.
+"""
+import bisect
+from collections import namedtuple
+
+import numpy as np
+
+from hierarchy import canonical
+
+# A match must share at least this share of the query's trigrams, unless it matches by prefix.
+MIN_OVERLAP = 0.4
+
+# ``target`` is the drill-down that shows the match: ("substation" | "nocs", name)
+Match = namedtuple("Match", ["kind", "name", "substation", "nocs", "target", "score"])
+
+
+def words(text):
+    """Canonical words of ``text``; "33/11KV" style voltage tokens stay words of their own."""
+    return [w for w in (canonical(part) for part in str(text).replace("/", " ").split()) if w]
+
+
+def _grams(word):
+    padded = "$" + word
+    return {padded[i:i + 3] for i in range(max(1, len(padded) - 2))}
+
+
+class SearchIndex:
+    def __init__(self, entries):
+        """``entries``: ``(kind, name, substation, nocs, target, text)`` tuples.
+
+        ``text`` is what is searched (a feeder's text includes its
+        substation, so "dhanmondi balaka" narrows to one feeder).
+        """
+        self.entries = list(entries)
+        postings = {}
+        prefix = []
+        self._sizes = np.zeros(len(self.entries), dtype=np.float64)
+        for i, entry in enumerate(self.entries):
+            grams = set()
+            for word in words(entry[-1]):
+                grams |= _grams(word)
+                prefix.append((word, i))
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+            self._sizes[i] = len(grams)
+        self._postings = {gram: np.array(ids, dtype=np.int64) for gram, ids in postings.items()}
+        self._kinds = np.array([entry[0] for entry in self.entries], dtype=object)
+        prefix.sort()
+        self._words = [w for w, _ in prefix]
+        self._word_ids = np.array([i for _, i in prefix], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.entries)
+
+    @classmethod
+    def from_data(cls, data):
+        """Index of the NOCS, substations and feeders of a ``FeederData``."""
+        entries = []
+        for name in data.index["nocs"].keys():
+            entries.append(("nocs", name, None, name, ("nocs", name), name))
+        for name in data.index["substation"].keys():
+            entries.append(("substation", name, name, None, ("substation", name), name))
+        df = data.df
+        _, first = np.unique(data.registry.feeder_ids, return_index=True)
+        feeders = df["Feeder_Name"].to_numpy(dtype=object)[first]
+        substations = df["Substation"].to_numpy(dtype=object)[first]
+        nocs = df["NOCS"].to_numpy(dtype=object)[first]
+        for feeder, substation, n in zip(feeders, substations, nocs):
+            if isinstance(feeder, str) and isinstance(substation, str):
+                feeder = " ".join(feeder.split())
+                entries.append(("feeder", feeder, substation, n, ("substation", substation),
+                                feeder + " " + substation))
+        return cls(entries)
+
+    def _prefixed(self, word):
+        """Ids of entries with a word starting with ``word``."""
+        lo = bisect.bisect_left(self._words, word)
+        hi = bisect.bisect_left(self._words, word + "\x7f")
+        return self._word_ids[lo:hi]
+
+    def query(self, text, limit=20, kinds=None):
+        """Best ``Match``es for ``text``, best first.
+
+        Entries whose words start with every query word come first, then
+        entries by the share of the query's trigrams they contain.
+        """
+        terms = words(text)
+        if not terms or not self.entries:
+            return []
+        n = len(self.entries)
+        grams = set().union(*(_grams(t) for t in terms))
+        lists = [self._postings[g] for g in grams if g in self._postings]
+        hits = np.bincount(np.concatenate(lists), minlength=n) if lists else np.zeros(n)
+        overlap = hits / len(grams)
+        prefixed = np.ones(n, dtype=bool)
+        for term in terms:
+            found = np.zeros(n, dtype=bool)
+            found[self._prefixed(term)] = True
+            prefixed &= found
+        # Ties go to the shorter name: more of it is covered by the query
+        score = prefixed + overlap + 0.01 * hits / np.maximum(self._sizes, 1)
+        keep = prefixed | (overlap >= MIN_OVERLAP)
+        if kinds is not None:
+            keep &= np.isin(self._kinds, list(kinds))
+        ids = np.flatnonzero(keep)
+        ids = ids[np.argsort(-score[ids], kind="stable")[:limit]]
+        return [Match(*self.entries[i][:5], round(float(score[i]), 3)) for i in ids]
@@ -0,0 +1,269 @@
+"""Columnar on-disk snapshot of a workbook sheet.
+
+Parsing EB.xlsx takes the better part of a second even with the streaming
+reader in ``xlsx_reader``, and the in-process cache is gone after every
+restart, redeploy or worker fork. This module converts the sheet once into
+one ``.npy`` file per column and memory-maps those files on later loads, so a
+cold start only pays for reading a few small files.
+
+Snapshots are keyed by the SHA-256 of the workbook (plus the read options).
+A pointer file remembers the workbook's mtime and size, so an unchanged
+workbook is recognised with a single ``stat`` call and is never re-hashed.
+
+Run ``python snapshot.py EB.xlsx`` to ingest ahead of time.
+
+For several server processes, one ingest publishes the snapshot instead
+(``python snapshot.py EB.xlsx --publish``): the file ``CURRENT`` in the
+cache directory names the live snapshot and is swapped atomically. Workers
+only read ``CURRENT`` and memory-map what it points to, so N workers cost
+one parse and share one page-cache copy of the numeric column files; text
+columns are decoded into each process. A ``layout`` (e.g. the feeder
+table's row filter and order, ``engine.feeder_rows``) is applied before the
+columns are written, so a reader that serves rows in that layout can hand
+out slices of the mapped columns instead of copying them. The smaller
+sheets the dashboard also reads ("%Loss ", "SS List") are published with
+it, so workers never open the workbook. Snapshot directories are
+immutable; a new workbook is a new directory.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from xlsx_reader import read_sheet
+
+CACHE_DIR = ".eb_snapshot"
+FORMAT_VERSION = 2
+CURRENT = "CURRENT"
+
+
+def file_digest(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _options_key(sheet_name, usecols, nrows, layout=None):
+    options = [FORMAT_VERSION, sheet_name, usecols, nrows]
+    if layout is not None:
+        # Layouts are keyed by name: rename one when it changes the rows it writes
+        options.append(f"{layout.__module__}.{layout.__qualname__}")
+    raw = json.dumps(options)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:12]
+
+
+def _json_value(value):
+    # Workbook cells are str/int/float/bool; anything exotic is kept as text.
+    if isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def write_snapshot(df, target):
+    """Write ``df`` column by column into the directory ``target``.
+
+    Numeric columns are stored as-is. Text and mixed-type columns are
+    dictionary encoded: an ``int32`` code array on disk plus the distinct
+    values in ``meta.json`` (code ``-1`` is a missing cell).
+    """
+    parent = os.path.dirname(os.path.abspath(target))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".tmp-", dir=parent)
+    columns = []
+    try:
+        for i, name in enumerate(df.columns):
+            col = df[name]
+            fname = f"c{i:03d}.npy"
+            if pd.api.types.is_numeric_dtype(col.dtype):
+                np.save(os.path.join(tmp, fname), col.to_numpy())
+                columns.append({"name": name, "file": fname, "kind": "numeric"})
+            else:
+                codes, uniques = pd.factorize(col.to_numpy(dtype=object))
+                np.save(os.path.join(tmp, fname), codes.astype(np.int32))
+                columns.append({
+                    "name": name,
+                    "file": fname,
+                    "kind": "dictionary",
+                    "values": [_json_value(v) for v in uniques],
+                })
+        meta = {"format": FORMAT_VERSION, "rows": len(df), "columns": columns}
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as fh:
+            json.dump(meta, fh, ensure_ascii=False)
+        try:
+            os.replace(tmp, target)
+        except OSError:
+            # Another process published the same snapshot first.
+            if not os.path.isdir(target):
+                raise
+            shutil.rmtree(tmp, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def read_snapshot(target):
+    """Load a snapshot directory; numeric columns stay memory-mapped."""
+    with open(os.path.join(target, "meta.json"), encoding="utf-8") as fh:
+        meta = json.load(fh)
+    data = {}
+    for col in meta["columns"]:
+        arr = np.load(os.path.join(target, col["file"]), mmap_mode="r")
+        if col["kind"] == "dictionary":
+            values = np.empty(len(col["values"]) + 1, dtype=object)
+            values[:-1] = col["values"]
+            values[-1] = np.nan
+            arr = values[arr]
+        data[col["name"]] = arr
+    return pd.DataFrame(data, columns=[c["name"] for c in meta["columns"]], copy=False)
+
+
+def _read_pointer(path):
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_pointer(path, pointer):
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=os.path.dirname(path))
+    with os.fdopen(fd, "w", encoding="utf-8") as fh:
+        json.dump(pointer, fh)
+    os.replace(tmp, path)
+
+
+def snapshot_path(io, sheet_name, usecols=None, nrows=None, cache_dir=CACHE_DIR, layout=None):
+    """Return the snapshot directory for ``io``, building it if needed.
+
+    ``layout``, if given, maps the parsed sheet to the frame that is stored.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    opts = _options_key(sheet_name, usecols, nrows, layout)
+    info = os.stat(io)
+    pointer_file = os.path.join(cache_dir, f"{opts}.json")
+    pointer = _read_pointer(pointer_file)
+    source = os.path.abspath(io)
+    if (pointer and pointer["source"] == source and pointer["mtime_ns"] == info.st_mtime_ns
+            and pointer["size"] == info.st_size):
+        target = os.path.join(cache_dir, pointer["snapshot"])
+        if os.path.isdir(target):
+            return target
+
+    # mtime changed (or first run): the content hash decides whether to re-parse.
+    digest = file_digest(io)
+    name = f"{opts}-{digest[:32]}"
+    target = os.path.join(cache_dir, name)
+    if not os.path.isdir(target):
+        df = read_sheet(io, sheet_name, usecols, nrows)
+        write_snapshot(df if layout is None else layout(df), target)
+    _write_pointer(pointer_file, {
+        "source": source,
+        "mtime_ns": info.st_mtime_ns,
+        "size": info.st_size,
+        "sha256": digest,
+        "snapshot": name,
+    })
+    return target
+
+
+def _prefix(name):
+    # Snapshots of the same sheet and read options share the part before the digest
+    return name.split("-")[0] + "-"
+
+
+def publish(io, sheet_name, usecols=None, nrows=None, cache_dir=CACHE_DIR, keep=3, sheets=(), layout=None):
+    """Build the snapshot of ``io`` and make it the one ``CURRENT`` points to.
+
+    ``sheets`` are the read options (``sheet_name``, ``usecols``, ``nrows``)
+    of further sheets the workers need; they are snapshotted alongside and
+    named in ``CURRENT`` (``current_sheet``), so workers never open the
+    workbook. A sheet the workbook does not have is left out.
+
+    The pointer is replaced atomically, so a worker sees either the old or
+    the new version, never a partial one. Apart from the new ones, only the
+    ``keep`` most recently published snapshots of each sheet are kept;
+    workers still mapping a removed one keep their (unlinked) files until
+    they move on.
+    """
+    target = snapshot_path(io, sheet_name, usecols, nrows, cache_dir, layout)
+    name = os.path.basename(target)
+    found = {}
+    for options in sheets:
+        try:
+            found[options["sheet_name"]] = os.path.basename(snapshot_path(io, cache_dir=cache_dir, **options))
+        except (KeyError, ValueError):
+            continue
+    published = {name, *found.values()}
+    previous = _read_pointer(os.path.join(cache_dir, CURRENT)) or {}
+    history = []
+    for old in [previous.get("snapshot"), *previous.get("sheets", {}).values(), *previous.get("history", [])]:
+        if (old and old not in published and old not in history
+                and sum(h.startswith(_prefix(old)) for h in history) < keep):
+            history.append(old)
+    _write_pointer(os.path.join(cache_dir, CURRENT), {
+        "snapshot": name,
+        "sheets": found,
+        "source": os.path.abspath(io),
+        "history": history,
+    })
+    prefixes = tuple({_prefix(n) for n in published})
+    for entry in os.listdir(cache_dir):
+        if entry.startswith(prefixes) and entry not in published and entry not in history:
+            shutil.rmtree(os.path.join(cache_dir, entry), ignore_errors=True)
+    return target
+
+
+def current_snapshot(cache_dir=CACHE_DIR):
+    """Directory of the published snapshot, or ``None`` if nothing is published."""
+    pointer = _read_pointer(os.path.join(cache_dir, CURRENT))
+    if not pointer:
+        return None
+    target = os.path.join(cache_dir, pointer["snapshot"])
+    return target if os.path.isdir(target) else None
+
+
+def current_sheet(sheet_name, cache_dir=CACHE_DIR):
+    """Directory of ``sheet_name`` as published with the current snapshot, or ``None``."""
+    pointer = _read_pointer(os.path.join(cache_dir, CURRENT))
+    name = (pointer or {}).get("sheets", {}).get(sheet_name)
+    if name is None:
+        return None
+    target = os.path.join(cache_dir, name)
+    return target if os.path.isdir(target) else None
+
+
+def load_sheet(io, sheet_name, usecols=None, nrows=None, cache_dir=CACHE_DIR, layout=None):
+    """``pd.read_excel`` equivalent that goes through the columnar snapshot."""
+    return read_snapshot(snapshot_path(io, sheet_name, usecols, nrows, cache_dir, layout))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the columnar snapshot of a workbook sheet.")
+    parser.add_argument("workbook", nargs="?", default="EB.xlsx")
+    parser.add_argument("--sheet", help="another sheet than the feeder table (engine.SHEET)")
+    parser.add_argument("--usecols")
+    parser.add_argument("--nrows", type=int)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--publish", action="store_true", help="make it the CURRENT snapshot for all workers")
+    args = parser.parse_args()
+    if args.sheet is None:
+        from engine import SHEET as options
+    else:
+        options = dict(sheet_name=args.sheet, usecols=args.usecols, nrows=args.nrows)
+    if args.publish:
+        from hierarchy import SS_LIST_SHEET
+        from losses import LOSS_SHEET
+
+        print(publish(args.workbook, cache_dir=args.cache_dir, sheets=[LOSS_SHEET, SS_LIST_SHEET], **options))
+    else:
+        print(snapshot_path(args.workbook, cache_dir=args.cache_dir, **options))
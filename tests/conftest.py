@@ -0,0 +1,17 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def workbook_dir(tmp_path, monkeypatch):
+    """A directory holding a copy of EB.xlsx and a corrupt ``bad.xlsx``; also the working directory."""
+    shutil.copy(os.path.join(ROOT, "EB.xlsx"), tmp_path / "EB.xlsx")
+    (tmp_path / "bad.xlsx").write_bytes(b"x")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,13 @@
+import io
+import zipfile
+
+from batch import _file_name, export_zip, tasks
+from engine import FeederData
+
+
+def test_pool_renders_the_dashboards_reports(workbook_dir):
+    balance = FeederData.load().balance()  # as app.load_feeders loads it
+    expected = [f"{kind}/{_file_name(name)}.pdf" for kind, name in tasks(balance)]
+    with zipfile.ZipFile(io.BytesIO(export_zip(jobs=2))) as zf:
+        assert zf.namelist() == expected
+    assert "substation/Maniknagar_132_33_S_S.pdf" in expected  # the "SS List" spelling
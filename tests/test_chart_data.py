@@ -0,0 +1,43 @@
+import pandas as pd
+
+from chart_data import MIN_ITEMS, OTHER, collapse, hierarchy
+
+
+def _frame():
+    feeders = [f"F{i}" for i in range(10)]
+    return pd.DataFrame({
+        "NOCS": ["A"] * 10 + ["B", "B", "A"],
+        "Feeder_Name": feeders + ["G0", "G1", "F0"],  # F0 twice: summed into one item
+        "Color": ["red"] * 10 + ["blue", "blue", "red"],
+        "Corrected_Consumption": [10.0, -9.0, 8, 7, 6, 5, 4, 3, 2, 1] + [1.0, 2.0, 5.0],
+    })
+
+
+def test_small_items_fold_into_other_and_keep_the_total():
+    frame = _frame()
+    bars = collapse(frame, "Feeder_Name", "Corrected_Consumption", by=["NOCS"], limit=3, carry=["Color"])
+    a = bars[bars["NOCS"] == "A"]
+    assert a["Feeder_Name"].tolist() == ["F0", "F1", "F2", f"{OTHER} (7)"]  # by absolute value
+    assert a["Corrected_Consumption"].tolist() == [15.0, -9.0, 8.0, 28.0]
+    assert a["Items"].tolist() == [1, 1, 1, 7] and a["Color"].tolist() == ["red"] * 3 + [OTHER]
+    assert bars["NOCS"].tolist()[-2:] == ["B", "B"] and bars["Items"].sum() == 12
+    totals = bars.groupby("NOCS")["Corrected_Consumption"].sum()
+    assert totals.to_dict() == frame.groupby("NOCS")["Corrected_Consumption"].sum().to_dict()
+
+
+def test_a_single_leftover_item_is_not_folded():
+    bars = collapse(_frame().iloc[:4], "Feeder_Name", "Corrected_Consumption", limit=3)
+    assert bars["Feeder_Name"].tolist() == ["F0", "F1", "F2", "F3"]
+
+
+def test_min_share_keeps_the_largest_few():
+    frame = pd.DataFrame({"Feeder_Name": [f"F{i}" for i in range(20)], "Corrected_Consumption": [1000.0] + [1.0] * 19})
+    bars = collapse(frame, "Feeder_Name", "Corrected_Consumption", min_share=0.1)
+    assert len(bars) == MIN_ITEMS + 1 and bars["Corrected_Consumption"].sum() == 1019.0
+
+
+def test_hierarchy_keeps_the_total():
+    frame = _frame()
+    rows = hierarchy(frame, ["NOCS", "Feeder_Name"], "Corrected_Consumption", limit=3)
+    assert rows["Corrected_Consumption"].sum() == frame["Corrected_Consumption"].sum()
+    assert rows.groupby("NOCS").size().max() <= 4
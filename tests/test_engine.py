@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from engine import CURRENT_READINGS, FeederData
+
+
+def test_shared_frame_cannot_be_written_through_its_arrays(workbook_dir):
+    data = FeederData.from_workbook("EB.xlsx")
+    before = data.df["Consumption"].sum()
+    with pytest.raises(ValueError):
+        data.df["Consumption"].to_numpy()[:] = 0
+    with pytest.raises(ValueError):
+        data.index["substation"].frame["Consumption"].to_numpy()[:] = 0
+    names = data.df["Substation_Name"].to_numpy()
+    names[:] = "x"
+    assert data.df["Consumption"].sum() == before
+    assert not np.any(data.df["Substation_Name"].to_numpy() == "x")
+
+
+def test_earlier_months_show_no_current_readings(workbook_dir):
+    data = FeederData.from_workbook("EB.xlsx")
+    substation = next(iter(data.index["substation"].keys()))
+    latest = data.balance().table("substation", substation)
+    earlier = data.balance(data.months[1]).table("substation", substation)
+    assert latest["Opening_Reading"].notna().any()
+    assert earlier[CURRENT_READINGS].isna().all().all()
+    assert (earlier["Consumption"] == earlier["Corrected_Consumption"]).all()
+    assert len(earlier) == len(latest)
+
+
+def test_loss_only_for_the_metered_month(workbook_dir):
+    data = FeederData.from_workbook("EB.xlsx")
+    assert data.balance().substations["Loss"].notna().any()
+    assert data.balance(data.months[1]).substations["Loss"].isna().all()
@@ -0,0 +1,12 @@
+import os
+
+from export import export_all
+
+
+def test_corrupt_workbook_does_not_stop_the_others(workbook_dir):
+    results = {os.path.basename(workbook): (paths, error)
+               for (workbook, _, paths), error in export_all([str(workbook_dir)], out="out", jobs=1)}
+    assert results["bad.xlsx"][1] is not None
+    paths, error = results["EB.xlsx"]
+    assert error is None
+    assert os.path.exists(os.path.join("out", "EB", "summary.csv"))
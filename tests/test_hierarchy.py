@@ -0,0 +1,55 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from engine import SHEET, FeederData
+from figures import html_table
+from hierarchy import UNKNOWN, Registry, nocs_mapping
+from snapshot import read_snapshot, snapshot_path
+
+
+def _groupby(df):
+    # Straight from nocs_mapping, without the registry
+    value = df["Corrected_Consumption"].fillna(0)
+    return {
+        "N": value.groupby(df["NOCS"]).sum(),
+        "C": value.groupby(df["NOCS"].map(lambda n: nocs_mapping[n][0])).sum(),
+        "Z": value.groupby(df["NOCS"].map(lambda n: nocs_mapping[n][1])).sum(),
+    }
+
+
+def test_rollup_matches_a_plain_groupby(workbook_dir):
+    data = FeederData.load()
+    expected = _groupby(read_snapshot(snapshot_path("EB.xlsx", **SHEET)))
+    totals = data.registry.rollup(data.df["NOCS"], data.df["Corrected_Consumption"])
+    for level, found in zip("NCZ", (totals.nocs, totals.circle, totals.zone)):
+        found = found[found != 0]
+        assert sorted(found.index) == sorted(expected[level].index)
+        assert np.allclose(found[expected[level].index], expected[level])
+
+
+def test_html_table_shows_the_rounded_totals(workbook_dir):
+    data = FeederData.load()
+    balance = data.balance()
+    expected = _groupby(read_snapshot(snapshot_path("EB.xlsx", **SHEET)))
+    cells = dict(re.findall(r'<td class="([NCZ]_[^"]+)"[^>]*>([^<]+)</td>', html_table(data.registry, balance.totals)))
+    for level, totals in expected.items():
+        for name, total in totals.items():
+            # NOCS totals are rounded before they are summed up
+            assert abs(float(cells[f"{level}_{name}"]) - total) <= 0.5 * len(expected["N"])
+
+
+def test_attach_maps_nocs_to_circle_and_zone():
+    df = pd.DataFrame({
+        "NOCS": ["Maniknagar", "n.gonj (east)", " Demra ", "Nowhere", 0],
+        "Substation_Name": ["A 33/11 KV S/S", "B", "a 33/11kv ss", "C", "D"],
+        "Feeder_Name": ["F1", "F2", "F3", "F4", "F5"],
+    })
+    attached = Registry(df=df).attach(df)
+    assert all(isinstance(attached[c].dtype, pd.CategoricalDtype) for c in ("NOCS", "Circle", "Zone", "Substation"))
+    assert attached["NOCS"].tolist() == ["Maniknagar", "N.Gonj (East)", "Demra", UNKNOWN, UNKNOWN]
+    assert attached["Circle"].tolist() == ["Kazla", "N.Gonj (West)", "Demra", UNKNOWN, UNKNOWN]
+    assert attached["Zone"].tolist() == ["South", "South", "South", UNKNOWN, UNKNOWN]
+    assert attached["Substation"].tolist() == ["A 33/11 KV S/S", "B", "A 33/11 KV S/S", "C", "D"]
+    assert attached["Substation_Name"].tolist() == df["Substation_Name"].tolist()
@@ -0,0 +1,43 @@
+import numpy as np
+
+from engine import SHEET, FeederData, listing
+from ingest import History
+from snapshot import read_snapshot, snapshot_path
+from timeseries import month_columns
+
+
+def _data(df, history=None):
+    return FeederData(df, listing=listing("EB.xlsx"), history=history)
+
+
+def test_only_the_current_month_is_diffed(workbook_dir):
+    df = read_snapshot(snapshot_path("EB.xlsx", **SHEET))
+    history = History("history")
+    first = history.ingest(_data(df))
+    assert first["deltas"] == 0 and len(first["appended"]) == len(month_columns(df.columns)) + 1
+
+    oldest = min(month_columns(df.columns), key=month_columns(df.columns).get)
+    restated = df.copy()
+    restated.loc[0, "Corrected_Consumption"] += 100.0
+    restated.loc[0, oldest] += 100.0  # history columns are not re-read
+    data = _data(restated)
+    second = history.ingest(data)
+    assert second["appended"] == [] and second["deltas"] == 1
+    assert set(history.deltas()["month"]) == {first["month"]}
+
+    nocs = history.read_rollup(first["month"])["nocs"]
+    expected = data.registry.rollup(data.df["NOCS"], data.df["Corrected_Consumption"]).nocs
+    assert np.allclose([nocs[name] for name in nocs], expected[list(nocs)])
+
+
+def test_stored_months_extend_the_workbook(workbook_dir):
+    df = read_snapshot(snapshot_path("EB.xlsx", **SHEET))
+    full = _data(df)
+    History("history").ingest(full)
+    columns = month_columns(df.columns)
+    oldest = min(columns, key=columns.get)
+
+    data = _data(df.drop(columns=[oldest]), history=History("history"))
+    assert data.months == full.months
+    month = full.months[-1]
+    assert np.array_equal(data.monthly.column(month), full.monthly.column(month), equal_nan=True)
@@ -0,0 +1,45 @@
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from engine import FeederData
+from losses import LossHistory, LossModel, read_loss_history
+
+
+def test_long_sheet_with_import_columns(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    book = openpyxl.Workbook()
+    sheet = book.active
+    sheet.title = "%Loss "
+    sheet.append([None, None, "132 KV SS", "33 KV SS"])
+    sheet.append([None, None, "ALL SS", 90, 90, None, 90])
+    sheet.append([None, None, "Name of S/S", "Page No.", "May-2024\n% of Loss", "May-2024\nImport",
+                  "April-2024\n% of Loss"])
+    for i in range(200):
+        sheet.append([None, i + 1, f"Substation {i} 33/11 KV S/S", i + 1, 2.5, 1000.0 * (i + 1), 3.0])
+    sheet.append([None, "Total", None, None, 2.5, 20100000.0, 3.0])
+    sheet.append([None, None, "Prepared by", None, 1.0])
+    book.save("loss.xlsx")
+
+    history = read_loss_history("loss.xlsx")
+    assert history.loss.shape == (200, 2) and history.imported.shape == (200, 2)
+    assert history.loss.index[0] == "Substation 0 33/11 KV S/S"
+    assert list(history.loss.columns) == ["May-2024", "April-2024"]
+    assert history.imported["May-2024"].iloc[-1] == 200000.0
+    assert history.imported["April-2024"].isna().all()
+
+
+def test_metered_import_is_not_derived_from_the_loss(workbook_dir):
+    data = FeederData.from_workbook("EB.xlsx")
+    month = data.monthly.latest
+    loss = data.loss_history.loss
+    substation = data.losses.matched.index[0]
+    name = data.losses.matched.iloc[0]
+    imported = pd.DataFrame(np.nan, index=loss.index, columns=loss.columns)
+    imported.loc[name, month] = 5e6
+    model = LossModel(data, LossHistory(loss, imported))
+
+    row = model.month(month).substation.set_index("Substation_Name").loc[substation]
+    assert row["Import"] == 5e6
+    assert np.isclose(row["Loss"], (5e6 - row["Sales"]) / 5e6 * 100)
+    assert not np.isclose(row["Loss"], loss.loc[name, month])
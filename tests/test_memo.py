@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from grid import Grid
+from memo import Memo, sizeof
+
+
+def _frame(rows=2000):
+    return pd.DataFrame({"Feeder_Name": [f"Feeder {i}" for i in range(rows)], "Consumption": np.arange(rows)})
+
+
+def test_grid_size_counts_orders_and_filter_text():
+    grid = Grid(_frame())
+    built = sizeof(grid)
+    assert built >= int(grid.frame.memory_usage(deep=True).sum())
+    grid.page(sort="Consumption", query="feeder 1")
+    assert sizeof(grid) > built
+
+
+def test_grid_filter_does_not_match_blank_cells():
+    grid = Grid(pd.DataFrame({"Feeder_Name": ["Nandan", None], "Remarks": [np.nan, "ok"]}))
+    assert list(grid.view(query="nan")) == [0]
+    assert list(grid.view(query="ok")) == [1]
+
+
+def test_resize_evicts_when_a_grid_grows():
+    grown = Grid(_frame())
+    grown.page(query="feeder")
+    first, second = Grid(_frame()), Grid(_frame())
+    # Room for both grids as built, but not once one of them has its filter text
+    memo = Memo(max_bytes=sizeof(grown) + sizeof(first) - 1)
+    memo.get("v1", "first", lambda: first)
+    memo.get("v1", "second", lambda: second)
+    assert len(memo) == 2
+    second.page(query="feeder")
+    memo.resize("v1", "second")
+    assert memo.size == sizeof(second) <= memo.max_bytes
+    assert len(memo) == 1 and memo.get("v1", "second", lambda: None) is second
+
+
+def test_an_older_version_does_not_switch_back():
+    memo = Memo()
+    memo.get("v1", "chart", lambda: "old")
+    assert memo.get("v2", "chart", lambda: "new") == "new"
+    # A session still on v1 during the swap: built for it, not kept, nothing cleared
+    assert memo.get("v1", "chart", lambda: "rebuilt") == "rebuilt"
+    assert memo.version == "v2" and memo.get("v2", "chart", lambda: None) == "new"
+    assert memo.get("v1", "chart", lambda: "again") == "again" and len(memo) == 1
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+
+from engine import FeederData
+from partition import PartitionIndex
+
+
+def _check(index, df):
+    for key in index.keys():
+        mask = df[index.key] == key
+        tm.assert_frame_equal(index.rows(key), df[mask])
+        tm.assert_frame_equal(index.rows(key, ["Consumption"]), df.loc[mask, ["Consumption"]])
+        for column in index.totals:
+            assert np.isclose(index.total(key, column), df.loc[mask, column].sum())
+    expected = [df.loc[df[index.key] == key, "Consumption"].sum() for key in index.keys()]
+    assert np.allclose(index.sums(df["Consumption"]), expected)
+
+
+def test_rows_and_totals_match_a_mask():
+    df = pd.DataFrame({
+        "Key": ["b", "a", "b", None, "c", "c", "a"],
+        "Consumption": [1.0, 2.0, np.nan, 4.0, 5.0, 6.0, 7.0],
+        "Corrected_Consumption": [10.0, 20.0, 30.0, 40.0, 50.0, np.nan, 70.0],
+    }, index=[10, 11, 12, 13, 14, 15, 16])
+    index = PartitionIndex(df, "Key")
+    assert index.keys() == ["b", "a", "c"] and None not in index
+    assert index.contiguous.tolist() == [False, False, True]
+    _check(index, df)
+    assert index.rows("x").empty and index.total("x", "Consumption") == 0.0
+
+
+def test_feeder_table_partitions_match_a_mask(workbook_dir):
+    data = FeederData.load()
+    for index in data.index.values():
+        _check(index, data.df)
@@ -0,0 +1,22 @@
+import pandas as pd
+from fpdf import FPDF
+
+from pdf_table import _text_widths, write_table
+
+
+def _pdf():
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", "", 7)
+    return pdf
+
+
+def test_text_widths_of_no_texts():
+    assert len(_text_widths(_pdf(), [])) == 0
+
+
+def test_empty_table_writes_the_header():
+    pdf = _pdf()
+    y = pdf.y
+    write_table(pdf, pd.DataFrame({"Feeder_Name": [], "Consumption": []}))
+    assert pdf.y > y
@@ -0,0 +1,16 @@
+import os
+
+from readings import TEXT, load_readings
+
+
+def test_corrupt_workbook_is_skipped(workbook_dir):
+    table, skipped = load_readings(["EB.xlsx", "bad.xlsx"], sheets=["NORTH-1"], jobs=1)
+    assert [(os.path.basename(w), sheet) for w, sheet, _ in skipped] == [("bad.xlsx", "NORTH-1")]
+    assert len(table) and set(table["Workbook"]) == {"EB.xlsx"}
+
+
+def test_text_columns_share_one_dictionary(workbook_dir):
+    table, _ = load_readings(["EB.xlsx"], sheets=["NORTH-1", "PDB Bill AMR"], jobs=1)
+    categories = [table[column].cat.categories for column in TEXT]
+    assert all(c is categories[0] for c in categories)
+    assert table.groupby("Sheet", observed=True).size().to_dict().keys() == {"NORTH-1", "PDB Bill AMR"}
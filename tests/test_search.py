@@ -0,0 +1,32 @@
+from search import SearchIndex
+
+
+def _index():
+    dhanmondi = "Dhanmondi 33/11 KV S/S"
+    return SearchIndex([
+        ("nocs", "Dhanmondi", None, "Dhanmondi", ("nocs", "Dhanmondi"), "Dhanmondi"),
+        ("substation", dhanmondi, dhanmondi, None, ("substation", dhanmondi), dhanmondi),
+        ("feeder", "Balaka", dhanmondi, "Dhanmondi", ("substation", dhanmondi), "Balaka " + dhanmondi),
+        ("feeder", "Balaka", "Azimpur", "Azimpur", ("substation", "Azimpur"), "Balaka Azimpur"),
+        ("feeder", "Palash", "Azimpur", "Azimpur", ("substation", "Azimpur"), "Palash Azimpur"),
+    ])
+
+
+def test_prefix_matches_rank_first_shortest_first():
+    found = _index().query("dhan")
+    assert [(m.kind, m.name) for m in found] == [
+        ("nocs", "Dhanmondi"), ("substation", "Dhanmondi 33/11 KV S/S"), ("feeder", "Balaka")]
+    assert found[0].score > 1 >= _index().query("balka")[0].score
+
+
+def test_every_query_word_must_be_a_prefix():
+    found = _index().query("dhan bal")
+    assert found[0].name == "Balaka" and found[0].substation == "Dhanmondi 33/11 KV S/S"
+    assert found[0].score > 1 and all(m.score < 1 for m in found[1:])
+
+
+def test_typos_match_by_trigram_overlap():
+    found = _index().query("balka")
+    assert {(m.name, m.substation) for m in found} == {("Balaka", "Dhanmondi 33/11 KV S/S"), ("Balaka", "Azimpur")}
+    assert found[0].substation == "Azimpur"  # the shorter text
+    assert _index().query("balka", kinds=["nocs"]) == [] and _index().query("xyz") == []
@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+
+from engine import SHEET, FeederData, listing, loss_history
+from hierarchy import SS_LIST_SHEET
+from losses import LOSS_SHEET
+from snapshot import current_sheet, publish, read_snapshot, snapshot_path
+
+
+def test_workers_read_the_sheets_published_with_the_snapshot(workbook_dir, monkeypatch):
+    shared = str(workbook_dir / "shared")
+    publish("EB.xlsx", cache_dir=shared, sheets=[LOSS_SHEET, SS_LIST_SHEET], **SHEET)
+    assert current_sheet("%Loss ", shared) and current_sheet("SS List", shared)
+    monkeypatch.setenv("EB_SNAPSHOT_DIR", shared)
+    os.remove("EB.xlsx")
+
+    assert loss_history() is not None and listing() is not None
+    data = FeederData.load()
+    assert data.losses is not None and len(data.losses.matched)
+
+
+def test_republishing_keeps_the_recent_sheets(workbook_dir):
+    shared = str(workbook_dir / "shared")
+    published = []
+    for i in range(5):
+        with open("EB.xlsx", "ab") as fh:
+            fh.write(b"\0" * (i + 1))  # a new digest; the zip is still readable
+        publish("EB.xlsx", cache_dir=shared, keep=2, sheets=[LOSS_SHEET], **SHEET)
+        published.append(os.path.basename(current_sheet("%Loss ", shared)))
+    left = set(os.listdir(shared))
+    assert published[-1] in left and published[-2] in left and published[-3] in left
+    assert published[0] not in left and published[1] not in left
+
+
+def _mapped(array):
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = array.base
+    return False
+
+
+def test_feeder_table_is_served_from_the_mapped_columns(workbook_dir):
+    assert (read_snapshot(snapshot_path("EB.xlsx", **SHEET))["NOCS"] != 0).all()
+    data = FeederData.load()
+    assert _mapped(data.df["Corrected_Consumption"].to_numpy())
+    index = data.index["substation"]
+    assert index.contiguous.all()
+    for name in index.keys():
+        rows = index.rows(name)
+        assert _mapped(rows["Consumption"].to_numpy())
+        assert len(rows) == index.bounds(name)[1] - index.bounds(name)[0]
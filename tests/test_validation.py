@@ -0,0 +1,68 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from validation import CHECKS, READINGS, flag_table, flagged, outliers, reading_flags
+
+NAN = np.nan
+
+# One feeder per reading check, after a clean one:
+# Opening, Closing, Difference, OMF, CF, Consumption
+ROWS = {
+    None: [100, 150, 50, 2, 1, 100],
+    "missing": [100, 150, 50, NAN, 1, 100],
+    "rollover": [9990, 5, 15, 1, 1, 15],
+    "negative_difference": [500, 100, -400, 1, 1, -400],
+    "difference_mismatch": [100, 200, 90, 1, 1, 90],
+    "consumption_mismatch": [100, 200, 100, 2, 1, 150],
+}
+
+
+def _feeders():
+    df = pd.DataFrame(list(ROWS.values()), columns=READINGS, dtype=float)
+    return df.assign(Substation_Name="SS", Feeder_Name=[f"F{i}" for i in range(len(df))], NOCS="Motijheel")
+
+
+def test_each_reading_check_flags_its_feeder():
+    flags = reading_flags(_feeders())
+    for row, expected in enumerate(ROWS):
+        raised = {check for check, values in flags.items() if values[row]}
+        assert raised == ({expected} if expected else set()), expected
+
+
+def test_flag_table_adds_zero_consumption_and_outliers():
+    df = _feeders()
+    month = np.array([100, 0, NAN, 1, 1, 1], dtype=float)
+    outlier = np.array([0, 0, 0, 0, 0, 1], dtype=bool)
+    table = flag_table(df, month, outlier)
+    assert list(table.columns[4:-1]) == list(CHECKS)
+    assert table["zero_consumption"].tolist() == [False, True, True, False, False, False]
+    assert table["outlier"].tolist() == outlier.tolist()
+    assert table["flags"].tolist() == [0, 2, 2, 1, 1, 2]
+    assert len(flagged(table, ["outlier"])) == 1 and len(flagged(table, [])) == 0
+
+    earlier = flag_table(df, month, outlier, readings=False)
+    assert not earlier[list(reading_flags(df))].to_numpy().any()
+
+
+def test_mad_outliers():
+    values = np.array([
+        [10, 11, 9, 10, 100],         # one month far out
+        [10, NAN, 9, 11, 10],          # nothing out; blanks are never outliers
+        [5, 5, 5, 5, 7],               # flat history (MAD 0): any real difference is out
+        [5, 5, 5, 5, 5.5],             # ... but not a rounding difference
+        [0, 0, 0, 0, 0],               # all zero
+        [NAN, NAN, NAN, NAN, NAN],     # no history at all
+    ])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # nanmedian of the all-NaN row
+        found = outliers(values)
+    assert found.tolist() == [
+        [False, False, False, False, True],
+        [False] * 5,
+        [False, False, False, False, True],
+        [False] * 5,
+        [False] * 5,
+        [False] * 5,
+    ]
@@ -0,0 +1,62 @@
+import re
+import zipfile
+
+import openpyxl
+import pandas as pd
+import pandas.testing as tm
+
+from xlsx_reader import read_sheet
+
+
+def _workbook(path, rows):
+    book = openpyxl.Workbook()
+    sheet = book.active
+    sheet.title = "Data"
+    for row in rows:
+        sheet.append(row)
+    book.save(path)
+    return path
+
+
+def _strip_refs(source, target):
+    # Some writers leave out the optional ``r`` attribute of rows and cells
+    with zipfile.ZipFile(source) as zin, zipfile.ZipFile(target, "w") as zout:
+        for item in zin.infolist():
+            data = zin.read(item)
+            if item.filename.startswith("xl/worksheets/"):
+                data = re.sub(rb'<(row|c) r="[A-Z]*\d+"', rb"<\1", data)
+            zout.writestr(item, data)
+    return target
+
+
+def test_rows_and_cells_without_references(tmp_path):
+    # Without references a cell's column is its place in the row, so these rows have no gaps
+    rows = [["Name", "Value", "Flag"], ["a", 1, True], [None], ["b", 2.5, False], ["c", 3]]
+    source = _workbook(tmp_path / "refs.xlsx", rows)
+    target = _strip_refs(source, tmp_path / "norefs.xlsx")
+    assert not re.search(rb"<(row|c) r=", zipfile.ZipFile(target).read("xl/worksheets/sheet1.xml"))
+    for options in [{}, dict(usecols="B:C", nrows=2)]:
+        tm.assert_frame_equal(read_sheet(target, "Data", **options), read_sheet(source, "Data", **options))
+
+
+def _same_as_read_excel(path, sheet_name, **options):
+    expected = pd.read_excel(path, sheet_name=sheet_name, engine="openpyxl", **options)
+    tm.assert_frame_equal(read_sheet(path, sheet_name, **options), expected)
+
+
+def test_matches_read_excel(tmp_path):
+    rows = [["Name", "Value", "Name", None, "Flag", "Name"], ["a", 1, "x", None, True, 1],
+            ["b", 2.5, "y", 7, False, 2], ["c", None, "", 8, True, 3], ["d", 4, "w", 9, False, None]]
+    path = _workbook(tmp_path / "small.xlsx", rows)
+    for options in [{}, dict(usecols="A:C"), dict(usecols="C:F"), dict(usecols="B,D:F", nrows=2), dict(nrows=1)]:
+        _same_as_read_excel(path, "Data", **options)
+
+    # Unlike read_excel, blank rows are skipped (but still count towards nrows)
+    blank = _workbook(tmp_path / "blank.xlsx", rows[:2] + [[None] * 6] + rows[2:])
+    tm.assert_frame_equal(read_sheet(blank, "Data"), read_sheet(path, "Data"))
+    tm.assert_frame_equal(read_sheet(blank, "Data", nrows=3), read_sheet(path, "Data", nrows=2))
+
+
+def test_matches_read_excel_on_the_workbook(workbook_dir):
+    _same_as_read_excel("EB.xlsx", "Linked_11KV", usecols="B:AH", nrows=1226)
+    _same_as_read_excel("EB.xlsx", "SS List", usecols="A:D", nrows=500)
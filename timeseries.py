@@ -0,0 +1,104 @@
+"""Feeder x month consumption store behind the month selector.
+
+Linked_11KV carries the current month in ``Corrected_Consumption`` and the
+previous months as ``<Month><YY>_Consumption`` columns. ``MonthlyStore``
+packs them into one 2-D float array (feeders x months, oldest month first)
+whose axes are integer positions: feeder rows line up with the feeder table,
+and substations/NOCS are integer codes. Selecting a month, a month-over-month
+delta or a rolling 12-month total is then an array slice, not a rebuild of
+the feeder table.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from hierarchy import DEFAULT
+
+_MONTH_COLUMN = re.compile(r"^([A-Za-z]+)(\d{2})_Consumption$")
+
+
+def month_columns(columns):
+    """``{column: Period}`` for every ``<Month><YY>_Consumption`` column."""
+    found = {}
+    for col in columns:
+        m = _MONTH_COLUMN.match(str(col))
+        if m:
+            found[col] = pd.Period(f"{m.group(1)} 20{m.group(2)}", freq="M")
+    return found
+
+
+def month_label(period):
+    return period.strftime("%B-%Y")
+
+
+class MonthlyStore:
+    def __init__(self, values, months, substation_codes, substations, nocs_codes, nocs=None):
+        # Fortran order keeps every month contiguous, so column() is a cheap view.
+        self.values = np.asfortranarray(values, dtype=np.float64)
+        self.months = pd.PeriodIndex(months)
+        self.substation_codes = substation_codes
+        self.substations = substations
+        self.nocs_codes = nocs_codes
+        self.nocs = DEFAULT.nocs_dtype.categories if nocs is None else nocs
+        self._positions = {month_label(p): i for i, p in enumerate(self.months)}
+        self._cumsum = None
+
+    @classmethod
+    def from_frame(cls, df, current="Corrected_Consumption"):
+        """Build the store from the feeder table.
+
+        The current month is taken to be the month after the newest history
+        column and is read from ``current``.
+        """
+        history = sorted(month_columns(df.columns).items(), key=lambda kv: kv[1])
+        columns = [col for col, _ in history] + [current]
+        months = [p for _, p in history]
+        months.append(months[-1] + 1 if months else pd.Period.now("M"))
+        values = np.column_stack([df[c].to_numpy(dtype=np.float64) for c in columns])
+        # Registered names and codes where the table went through ``Registry.attach``
+        substation = df["Substation"] if "Substation" in df else df["Substation_Name"]
+        ss_codes, substations = pd.factorize(substation)
+        if isinstance(df["NOCS"].dtype, pd.CategoricalDtype):
+            nocs_codes, nocs = df["NOCS"].cat.codes.to_numpy(), df["NOCS"].cat.categories
+        else:
+            nocs_codes, nocs = DEFAULT.nocs_codes(df["NOCS"]), None
+        return cls(values, months, ss_codes, pd.Index(substations, dtype=object), nocs_codes, nocs)
+
+    @property
+    def labels(self):
+        """Month labels, newest first (the order the selector shows them)."""
+        return [month_label(p) for p in self.months[::-1]]
+
+    @property
+    def latest(self):
+        return month_label(self.months[-1])
+
+    def position(self, month):
+        return self._positions[month]
+
+    def column(self, month):
+        """Consumption of every feeder in ``month`` (a view, not a copy)."""
+        return self.values[:, self.position(month)]
+
+    def delta(self, month):
+        """Month-over-month change per feeder; NaN for the oldest month."""
+        i = self.position(month)
+        if i == 0:
+            return np.full(self.values.shape[0], np.nan)
+        return self.values[:, i] - self.values[:, i - 1]
+
+    def rolling_total(self, month, window=12):
+        """Sum of the ``window`` months ending at ``month`` per feeder.
+
+        Missing readings count as zero. The cumulative sum behind it is
+        computed once and serves every window size.
+        """
+        cum = self._cumsum
+        if cum is None:
+            filled = np.where(np.isnan(self.values), 0.0, self.values)
+            cum = np.zeros((filled.shape[0], filled.shape[1] + 1))
+            np.cumsum(filled, axis=1, out=cum[:, 1:])
+            self._cumsum = cum
+        i = self.position(month) + 1
+        return cum[:, i] - cum[:, max(0, i - window)]
@@ -0,0 +1,107 @@
+"""Meter-reading checks on the feeder table, as whole-column array operations.
+
+Every check produces one boolean per feeder; ``flag_table`` puts them side by
+side so the dashboard can filter on any combination. Outliers are judged
+against each feeder's own history: ``outliers`` works on the whole
+feeder x month matrix of ``timeseries.MonthlyStore`` at once, so checking
+every feeder in every month is a handful of vectorised reductions.
+"""
+import numpy as np
+import pandas as pd
+
+READINGS = ["Opening_Reading", "Closing_Reading", "Difference", "OMF", "CF", "Consumption"]
+
+# What each flag means, in the order the dashboard lists them.
+CHECKS = {
+    "missing": "a reading, OMF, CF or consumption is blank",
+    "rollover": "closing below opening, consistent with the register passing full scale",
+    "negative_difference": "closing below opening (not a rollover) or negative Difference",
+    "difference_mismatch": "Difference is not Closing - Opening",
+    "consumption_mismatch": "Consumption is not Difference x OMF x CF",
+    "zero_consumption": "no consumption in the month",
+    "outlier": "far outside the feeder's own monthly history",
+}
+
+# A rollover advances the register by less than this share of its full scale.
+ROLLOVER_SHARE = 0.1
+# Tolerance of the arithmetic checks: relative, plus an absolute kWh slack for rounding.
+RTOL = 1e-3
+ATOL = 1.0
+# Robust z-score (median / MAD) above which a month is an outlier for its feeder.
+OUTLIER_Z = 3.5
+
+
+def _column(df, name):
+    return df[name].to_numpy(dtype=np.float64)
+
+
+def _mismatch(actual, expected):
+    with np.errstate(invalid="ignore"):
+        return ~np.isnan(actual) & ~np.isnan(expected) & \
+            (np.abs(actual - expected) > ATOL + RTOL * np.abs(expected))
+
+
+def reading_flags(df):
+    """Checks of the current month's readings; ``{check: bool array}``."""
+    opening, closing, difference, omf, cf, consumption = (_column(df, c) for c in READINGS)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        backwards = closing < opening
+        # Full scale of the register: the next power of ten above the opening reading.
+        scale = 10.0 ** np.ceil(np.log10(np.abs(opening) + 1))
+        rollover = backwards & (scale - opening + closing < ROLLOVER_SHARE * scale)
+        negative = (backwards & ~rollover) | (difference < 0)
+    return {
+        "missing": np.isnan(np.column_stack([opening, closing, difference, omf, cf, consumption])).any(axis=1),
+        "rollover": rollover,
+        "negative_difference": negative,
+        "difference_mismatch": _mismatch(difference, closing - opening) & ~rollover,
+        "consumption_mismatch": _mismatch(consumption, difference * omf * cf),
+    }
+
+
+def outliers(values, threshold=OUTLIER_Z):
+    """Boolean feeders x months matrix: months far from the feeder's median.
+
+    Uses the robust z-score ``0.6745 * (x - median) / MAD`` per feeder
+    over all of its months. Feeders whose history does not vary (MAD 0)
+    flag any month that differs from the median.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        median = np.nanmedian(values, axis=1, keepdims=True)
+        deviation = np.abs(values - median)
+        mad = np.nanmedian(deviation, axis=1, keepdims=True)
+        z = np.where(mad > 0, 0.6745 * deviation / mad, np.where(deviation > ATOL, np.inf, 0.0))
+    return ~np.isnan(values) & (z > threshold)
+
+
+def flag_table(df, month_values, outlier_column, readings=True):
+    """One row per feeder with a boolean column per check and the number of flags.
+
+    ``month_values`` and ``outlier_column`` are aligned with ``df`` (the
+    selected month's consumption and its column of ``outliers``). With
+    ``readings=False`` (months before the current one, which only have a
+    consumption figure) the reading checks are left False.
+    """
+    flags = reading_flags(df) if readings else {}
+    month_values = np.asarray(month_values, dtype=np.float64)
+    flags["zero_consumption"] = np.nan_to_num(month_values) == 0
+    flags["outlier"] = np.asarray(outlier_column, dtype=bool)
+    columns = {name: flags.get(name, np.zeros(len(df), dtype=bool)) for name in CHECKS}
+    table = pd.DataFrame({
+        "Substation_Name": df["Substation_Name"].to_numpy(),
+        "Feeder_Name": df["Feeder_Name"].to_numpy(),
+        "NOCS": df["NOCS"].to_numpy(),
+        "Corrected_Consumption": month_values,
+        **columns,
+    }, index=df.index)
+    table["flags"] = np.sum(list(columns.values()), axis=0)
+    return table
+
+
+def flagged(table, checks=None):
+    """Rows of ``table`` raising any of ``checks`` (default: any check)."""
+    checks = list(CHECKS if checks is None else checks)
+    if not checks:
+        return table.iloc[:0]
+    return table[table[checks].to_numpy().any(axis=1)]
@@ -0,0 +1,306 @@
+"""Streaming reader for a single worksheet of an .xlsx workbook.
+
+``pd.read_excel(engine="openpyxl")`` opens and indexes the whole archive and
+loads the complete shared-strings table before it looks at the sheet we want.
+This reader only touches three archive members: the workbook index, the
+target sheet's XML (streamed with ``iterparse`` and abandoned as soon as the
+``nrows`` bound is reached) and the shared-strings table, which is streamed
+only up to the highest string index the slice actually refers to.
+
+The output follows ``pd.read_excel`` conventions for the options supported
+here: the first row is the header, duplicate headers are mangled to
+``name.1`` and blank ones named ``Unnamed: <column>`` (both judged over the
+whole row, as pandas does, also with ``usecols``), integral numbers become
+``int``, and error cells and empty strings are missing. Unlike
+``pd.read_excel``, fully blank rows are skipped rather than kept as NaN
+rows, and a boolean column with blanks stays ``object`` rather than
+becoming float. Number formats are not applied, so date-formatted cells
+come back as Excel serial numbers.
+"""
+import os
+import posixpath
+import re
+import zipfile
+from xml.etree import ElementTree as ET
+
+import numpy as np
+import pandas as pd
+
+_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+_ROW = _NS + "row"
+_CELL = _NS + "c"
+_VALUE = _NS + "v"
+_INLINE = _NS + "is"
+_TEXT = _NS + "t"
+_SI = _NS + "si"
+_PHONETIC = _NS + "rPh"
+_SHEET_DATA = _NS + "sheetData"
+
+_REF = re.compile(r"([A-Z]+)(\d+)")
+
+
+def workbooks(paths):
+    """The .xlsx files named by ``paths``; a directory stands for the workbooks in it."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                         if name.lower().endswith(".xlsx") and not name.startswith("~$"))
+        else:
+            found.append(path)
+    return found
+
+
+def column_index(letters):
+    """Zero-based index of an Excel column name: ``"A"`` -> 0, ``"AB"`` -> 27."""
+    idx = 0
+    for ch in letters.upper():
+        idx = idx * 26 + (ord(ch) - 64)
+    return idx - 1
+
+
+def parse_usecols(usecols):
+    """Translate a ``usecols`` spec into a sorted list of column indices.
+
+    Accepts ``None`` (all columns), an Excel range string such as ``"B:Z"`` or
+    ``"A,C:E"``, or a list of zero-based indices.
+    """
+    if usecols is None:
+        return None
+    if isinstance(usecols, str):
+        cols = set()
+        for part in usecols.split(","):
+            part = part.strip()
+            if ":" in part:
+                lo, hi = part.split(":")
+                cols.update(range(column_index(lo), column_index(hi) + 1))
+            else:
+                cols.add(column_index(part))
+        return sorted(cols)
+    return sorted(int(c) for c in usecols)
+
+
+def _sheet_member(zf, sheet_name):
+    workbook = ET.fromstring(zf.read("xl/workbook.xml"))
+    rel_id = None
+    for sheet in workbook.iter(_NS + "sheet"):
+        if sheet.get("name") == sheet_name:
+            rel_id = sheet.get(_REL_NS + "id")
+            break
+    if rel_id is None:
+        raise ValueError(f"Worksheet named '{sheet_name}' not found")
+    rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+    for rel in rels.iter(_PKG_REL_NS + "Relationship"):
+        if rel.get("Id") == rel_id:
+            target = rel.get("Target")
+            if target.startswith("/"):
+                return target.lstrip("/")
+            return posixpath.normpath(posixpath.join("xl", target))
+    raise ValueError(f"Worksheet '{sheet_name}' has no part in the archive")
+
+
+def _si_text(si):
+    return "".join(
+        t.text or ""
+        for node in si if node.tag != _PHONETIC
+        for t in ([node] if node.tag == _TEXT else node.iter(_TEXT))
+    )
+
+
+def _shared_strings(zf, wanted):
+    """Resolve only the shared-string indices in ``wanted``."""
+    if not wanted:
+        return {}
+    last = max(wanted)
+    found = {}
+    with zf.open("xl/sharedStrings.xml") as fh:
+        idx = 0
+        for _, elem in ET.iterparse(fh, events=("end",)):
+            if elem.tag != _SI:
+                continue
+            if idx in wanted:
+                found[idx] = _si_text(elem)
+            elem.clear()
+            if idx >= last:
+                break
+            idx += 1
+    return found
+
+
+def _number(text):
+    # openpyxl reads "12" as int and "12.0"/"1E3" as float; pandas then
+    # demotes integral floats to int.
+    if "." in text or "E" in text or "e" in text:
+        val = float(text)
+        return int(val) if val.is_integer() else val
+    return int(text)
+
+
+class _SharedRef(int):
+    """Placeholder for a shared-string cell until the table is resolved."""
+
+
+def _iter_cells(zf, member, wanted_cols):
+    """Yield ``(row_number, {col_index: value})`` for each ``<row>`` element.
+
+    Rows are cleared and detached once yielded, so memory stays flat no
+    matter how far into the sheet the caller reads.
+    """
+    last_col = max(wanted_cols) if wanted_cols else None
+    row_no = 0
+    with zf.open(member) as fh:
+        sheet_data = None
+        for event, elem in ET.iterparse(fh, events=("start", "end")):
+            if event == "start":
+                if elem.tag == _SHEET_DATA:
+                    sheet_data = elem
+                continue
+            if elem.tag != _ROW:
+                continue
+            # ``r`` is optional on rows and cells; without it they follow the previous one
+            number = elem.get("r")
+            row_no = int(number) if number else row_no + 1
+            values = {}
+            next_col = 0
+            for cell in elem.iter(_CELL):
+                ref = cell.get("r")
+                col = column_index(_REF.match(ref).group(1)) if ref else next_col
+                next_col = col + 1
+                if last_col is not None and col > last_col:
+                    # Cells come in column order; the rest of the row is not wanted
+                    break
+                if wanted_cols is not None and col not in wanted_cols:
+                    continue
+                kind = cell.get("t", "n")
+                if kind == "inlineStr":
+                    node = cell.find(_INLINE)
+                    value = _si_text(node) if node is not None else None
+                else:
+                    v = cell.find(_VALUE)
+                    text = v.text if v is not None else None
+                    if text is None or kind == "e":
+                        value = None
+                    elif kind == "s":
+                        value = _SharedRef(text)
+                    elif kind == "n":
+                        value = _number(text)
+                    elif kind == "b":
+                        value = text == "1"
+                    else:
+                        value = text
+                if value is not None and value != "":
+                    values[col] = value
+            elem.clear()
+            if sheet_data is not None:
+                sheet_data.remove(elem)
+            yield row_no, values
+
+
+def _typed_array(values):
+    """Pack one column's cell values into the narrowest sensible array."""
+    kinds = {type(v) for v in values if v is not None}
+    if not kinds:
+        return np.full(len(values), np.nan)
+    has_missing = any(v is None for v in values)
+    if kinds == {bool} and not has_missing:
+        return np.array(values, dtype=bool)
+    if kinds <= {int, float}:
+        if kinds == {int} and not has_missing:
+            return np.array(values, dtype=np.int64)
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    out = np.empty(len(values), dtype=object)
+    out[:] = [np.nan if v is None else v for v in values]
+    return out
+
+
+def _header_names(raw, cols):
+    # As pandas names them, over the whole row up to the last column read: a blank header is
+    # "Unnamed: <column>", the second "X" becomes "X.1", and so on.
+    names, counts = {}, {}
+    for col in range(cols[-1] + 1 if cols else 0):
+        name = raw.get(col)
+        if name is None:
+            name = f"Unnamed: {col}"
+        cur = counts.get(name, 0)
+        while cur > 0:
+            counts[name] = cur + 1
+            name = f"{name}.{cur}"
+            cur = counts.get(name, 0)
+        counts[name] = cur + 1
+        names[col] = name
+    return [names[col] for col in cols]
+
+
+def read_columns(io, sheet_name, usecols=None, nrows=None):
+    """Read a sheet slice into ``{header: ndarray}`` without loading the workbook.
+
+    The first row of the sheet is the header; ``nrows`` bounds the number of
+    data rows read after it.
+    """
+    wanted = parse_usecols(usecols)
+    wanted_set = None if wanted is None else set(wanted)
+    with zipfile.ZipFile(io) as zf:
+        member = _sheet_member(zf, sheet_name)
+        header_row, header, rows = None, {}, []
+        # Columns before the wanted ones are read too: the header names depend on them
+        cells = _iter_cells(zf, member, None if wanted is None else set(range(max(wanted, default=-1) + 1)))
+        try:
+            for row_no, values in cells:
+                if header_row is None:
+                    header_row, header = row_no, values
+                    continue
+                if nrows is not None and row_no > header_row + nrows:
+                    break
+                if wanted_set is not None:
+                    values = {c: v for c, v in values.items() if c in wanted_set}
+                if values:
+                    rows.append(values)
+        finally:
+            cells.close()
+
+        if wanted is None:
+            present = set(header)
+            for r in rows:
+                present.update(r)
+            wanted = list(range(max(present) + 1)) if present else []
+
+        refs = set()
+        for values in [header] + rows:
+            refs.update(v for v in values.values() if type(v) is _SharedRef)
+        strings = _shared_strings(zf, refs)
+
+    def resolve(v):
+        return strings[int(v)] if type(v) is _SharedRef else v
+
+    header = {c: resolve(v) for c, v in header.items()}
+    names = _header_names(header, wanted)
+    return {
+        name: _typed_array([resolve(r.get(col)) for r in rows])
+        for name, col in zip(names, wanted)
+    }
+
+
+def read_sheet(io, sheet_name, usecols=None, nrows=None):
+    """``pd.read_excel`` replacement for a single sheet slice."""
+    columns = read_columns(io, sheet_name, usecols, nrows)
+    return pd.DataFrame(columns, columns=list(columns), copy=False)
+
+
+def read_rows(io, sheet_name, usecols=None):
+    """Every non-blank row of a sheet as ``(row_number, {col_index: value})``.
+
+    For sheets that are not one table under a header row (blocks with their
+    own titles and totals). Values follow ``read_columns``; blank cells are
+    absent from the dicts.
+    """
+    wanted = parse_usecols(usecols)
+    with zipfile.ZipFile(io) as zf:
+        member = _sheet_member(zf, sheet_name)
+        rows = [(row_no, values) for row_no, values in
+                _iter_cells(zf, member, None if wanted is None else set(wanted)) if values]
+        strings = _shared_strings(zf, {v for _, values in rows for v in values.values() if type(v) is _SharedRef})
+    return [(row_no, {c: strings[int(v)] if type(v) is _SharedRef else v for c, v in values.items()})
+            for row_no, values in rows]